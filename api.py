@@ -0,0 +1,251 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, jsonify, request
+
+from models import db, Venue, Artist, State, Genre, venue_genre, artist_genre
+from cache import page_cache
+from deletion import live
+from queries import SHOW_COLUMNS, show_page, venue_shows, artist_shows, split_shows, \
+    parse_show_filters, show_calendar
+import scheduling
+
+# Column lists per resource: a response selects exactly the requested
+# columns, so nothing is hydrated into ORM objects.
+VENUE_COLUMNS = {
+    "id": Venue.id,
+    "name": Venue.name,
+    "city": Venue.city,
+    "state": State.code.label("state"),
+    "address": Venue.address,
+    "phone": Venue.phone,
+    "image_link": Venue.image_link,
+    "facebook_link": Venue.facebook_link,
+    "website_link": Venue.website_link,
+    "seeking_talent": Venue.seeking_talent,
+    "seeking_description": Venue.seeking_description,
+    "shows_count": Venue.shows_count,
+    "upcoming_shows_count": Venue.upcoming_shows_count,
+    "last_show_time": Venue.last_show_time,
+    "updated_at": Venue.updated_at,
+}
+
+ARTIST_COLUMNS = {
+    "id": Artist.id,
+    "name": Artist.name,
+    "city": Artist.city,
+    "state": State.code.label("state"),
+    "phone": Artist.phone,
+    "image_link": Artist.image_link,
+    "facebook_link": Artist.facebook_link,
+    "website_link": Artist.website_link,
+    "seeking_venue": Artist.seeking_venue,
+    "seeking_description": Artist.seeking_description,
+    "shows_count": Artist.shows_count,
+    "upcoming_shows_count": Artist.upcoming_shows_count,
+    "last_show_time": Artist.last_show_time,
+    "updated_at": Artist.updated_at,
+}
+
+# Fields of a single venue/artist that come from related rows, or in the
+# case of past_shows_count from the stored counters.
+DETAIL_FIELDS = ("genres", "past_shows", "upcoming_shows", "past_shows_count")
+COUNTER_FIELDS = ("shows_count", "upcoming_shows_count")
+
+RESOURCES = {
+    "venues": (Venue, VENUE_COLUMNS, venue_genre, "venue_id", venue_shows),
+    "artists": (Artist, ARTIST_COLUMNS, artist_genre, "artist_id", artist_shows),
+}
+
+bp = Blueprint('api', __name__)
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _serialize(row, fields):
+    return {field: _json_value(getattr(row, field)) for field in fields}
+
+
+def requested_fields(available, default=None):
+    fields = request.args.get('fields')
+    if not fields:
+        return list(default or available)
+    fields = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def page_limit():
+    config = current_app.config
+    limit = request.args.get('limit', config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, config['API_MAX_PAGE_SIZE']))
+
+
+def conditional_json(payload):
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@bp.route('/api/v1/<resource>', methods=['GET'])
+def api_list(resource):
+    if resource not in RESOURCES:
+        abort(404)
+    model, columns, _, _, _ = RESOURCES[resource]
+    fields = requested_fields(columns)
+    limit = page_limit()
+
+    query = db.session.query(
+            model.id, *[columns[f] for f in fields if f != "id"]
+        ).join(
+            State, model.state_id == State.id
+        ).filter(
+            live(model)
+        ).order_by(model.id)
+    after = request.args.get('after', type=int)
+    if after is not None:
+        query = query.filter(model.id > after)
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1].id)
+    return conditional_json({
+        "data": [_serialize(row, fields) for row in rows],
+        "next": next_cursor,
+    })
+
+
+@bp.route('/api/v1/<resource>/<int:entity_id>', methods=['GET'])
+def api_detail(resource, entity_id):
+    if resource not in RESOURCES:
+        abort(404)
+    model, columns, association, fk, shows_for = RESOURCES[resource]
+    fields = requested_fields(list(columns) + list(DETAIL_FIELDS))
+
+    column_fields = [f for f in fields if f in columns]
+    selected = column_fields
+    if "past_shows_count" in fields:
+        selected = column_fields + [f for f in COUNTER_FIELDS if f not in column_fields]
+    row = db.session.query(
+            model.id, *[columns[f] for f in selected if f != "id"]
+        ).join(
+            State, model.state_id == State.id
+        ).filter(model.id == entity_id, live(model)).first()
+    if row is None:
+        abort(404)
+    data = _serialize(row, column_fields)
+    if "past_shows_count" in fields:
+        # Every show is either past or upcoming.
+        data["past_shows_count"] = row.shows_count - row.upcoming_shows_count
+
+    if "genres" in fields:
+        data["genres"] = list(db.session.execute(
+            db.select(Genre.name).join(association, association.c.genre_id == Genre.id)
+            .where(association.c[fk] == entity_id).order_by(Genre.name)
+        ).scalars())
+
+    if "past_shows" in fields or "upcoming_shows" in fields:
+        past_shows, upcoming_shows = split_shows(shows_for(entity_id))
+        for name, shows_list in (("past_shows", past_shows), ("upcoming_shows", upcoming_shows)):
+            if name in fields:
+                data[name] = [{k: _json_value(v) for k, v in sh._mapping.items()} for sh in shows_list]
+
+    return conditional_json(data)
+
+
+def show_filters():
+    try:
+        return parse_show_filters(request.args)
+    except ValueError as e:
+        abort(400, str(e))
+
+
+@bp.route('/api/v1/shows', methods=['GET'])
+def api_shows():
+    fields = requested_fields(SHOW_COLUMNS)
+    filters = show_filters()
+    try:
+        rows, next_cursor = show_page(request.args.get('after'), page_limit(), fields, filters)
+    except ValueError:
+        abort(400, "Malformed cursor.")
+    return conditional_json({
+        "data": [_serialize(row, fields) for row in rows],
+        "next": next_cursor,
+    })
+
+
+@bp.route('/api/v1/shows/calendar', methods=['GET'])
+def api_show_calendar():
+    """Shows per day and area over `from`..`to` (inclusive, default the
+    next CALENDAR_DEFAULT_DAYS days), with the /api/v1/shows filters."""
+    filters = show_filters()
+    start = filters.pop('start', None) or datetime.combine(datetime.now().date(), datetime.min.time())
+    config = current_app.config
+    end = filters.pop('end', None) or start + timedelta(days=config['CALENDAR_DEFAULT_DAYS'])
+    if not timedelta(0) < end - start <= timedelta(days=config['CALENDAR_MAX_DAYS']):
+        abort(400, f"A calendar covers 1 to {config['CALENDAR_MAX_DAYS']} days.")
+    # Keyed on the normalized range and filters: every request for the same
+    # bucket shares one GROUP BY until a show, venue or artist write.
+    data = page_cache.memoize(
+        'calendar', ('shows', 'venues', 'artists'), dict(filters, start=start, end=end),
+        lambda: show_calendar(start, end, **filters))
+    return conditional_json({
+        "from": start.date().isoformat(),
+        "to": (end - timedelta(days=1)).date().isoformat(),
+        "data": data,
+    })
+
+
+def _proposed_show(index, item):
+    try:
+        show = {
+            "venue_id": int(item["venue_id"]),
+            "artist_id": int(item["artist_id"]),
+            "start_time": datetime.fromisoformat(item["start_time"]),
+            "id": int(item["id"]) if item.get("id") is not None else None,
+        }
+        if item.get("end_time"):
+            show["end_time"] = datetime.fromisoformat(item["end_time"])
+        else:
+            show["end_time"] = show["start_time"] + timedelta(
+                minutes=int(item.get("duration") or current_app.config['SHOW_DEFAULT_MINUTES']))
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        abort(400, f"shows[{index}]: missing or invalid field ({e})")
+    if not show["start_time"] < show["end_time"] <= show["start_time"] + scheduling.max_duration():
+        abort(400, f"shows[{index}]: a show runs for 1 to {current_app.config['SHOW_MAX_MINUTES']} minutes.")
+    return show
+
+
+@bp.route('/api/v1/shows/validate', methods=['POST'])
+def api_validate_shows():
+    """Check a calendar of proposed shows for double bookings, against the
+    booked shows and each other. Body: {"shows": [{"venue_id", "artist_id",
+    "start_time", "end_time" or "duration" (minutes), optional "id" of a
+    show being moved}]}. Nothing is written."""
+    payload = request.get_json(silent=True)
+    items = payload.get("shows") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        abort(400, 'Expected a JSON object with a "shows" list.')
+    max_shows = current_app.config['API_MAX_VALIDATE_SHOWS']
+    if len(items) > max_shows:
+        abort(400, f"At most {max_shows} shows per request.")
+    shows = [_proposed_show(index, item) for index, item in enumerate(items)]
+    conflicts = scheduling.validate(shows)
+    return jsonify({
+        "valid": not any(conflicts),
+        "data": [{"index": index, "conflicts": found} for index, found in enumerate(conflicts) if found],
+    })
+
+
+@bp.app_errorhandler(400)
+def bad_request_error(error):
+    if request.path.startswith('/api/'):
+        return jsonify({"error": error.description}), 400
+    return error
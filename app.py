@@ -2,126 +2,142 @@
 # Imports
 # ----------------------------------------------------------------------------#
 
+import functools
 import os
+from datetime import datetime
 
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+from flask import Blueprint, Flask, current_app, render_template, request, Response, flash, redirect, url_for, abort
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import FlaskForm
 from sqlalchemy import desc
-from sqlalchemy.orm import backref
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import backref, joinedload
 
 import config
 from forms import *
-from models import Artist, Venue, State, Genre, create_state, create_genre, Show, db, app
+from models import Artist, Venue, Show, db, migrate, \
+    set_genres, venue_genre, artist_genre, version_stamp
+from reference import reference_data
+import importer  # `flask import`
+import exporter  # /export/<file> and `flask export`
+import seed  # `flask init` and `flask db seed`
+import counters  # `flask counters`
+import api  # /api/v1
+from cache import page_cache, fragment_cache
+import instrumentation
+from instrumentation import query_budget
+import pooling  # /metrics/db-pool
+from assets import assets  # /assets and `flask assets build`
+import thumbnails  # /thumbnails
+import templating  # `flask templates compile`
+import async_views
+import scheduling
+import deletion
+from deletion import live
+from queries import venue_areas, venue_shows, artist_shows, show_page, split_shows, \
+    parse_show_filters, SHOW_FILTER_ARGS
+from search import full_text_search
 
 # ----------------------------------------------------------------------------#
 # App Config.
 # ----------------------------------------------------------------------------#
 
-
-db.create_all()
-create_state()
-create_genre()
+main = Blueprint('main', __name__)
 
 
 # ----------------------------------------------------------------------------#
 # Filters.
 # ----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _datetime_pattern(format, locale):
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+
+# Listings repeat the same start times (and re-render them on every
+# page), so formatted values are memoized too.
+@functools.lru_cache(maxsize=4096)
+def _format_datetime(value, format, locale):
+    if format in ('long', 'short'):
+        # Babel's own named formats combine a date and a time pattern.
+        return babel.dates.format_datetime(value, format, locale=locale)
+    pattern, locale = _datetime_pattern(format, locale)
+    return pattern.apply(value, locale)
+
+
+def format_datetime(value, format='medium', locale='en'):
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            import dateutil.parser
+            value = dateutil.parser.parse(value)
+    return _format_datetime(value, format, locale)
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+main.add_app_template_filter(format_datetime, 'datetime')
 
 
 # ----------------------------------------------------------------------------#
 # Controllers.
 # ----------------------------------------------------------------------------#
 
-@app.route('/', methods=['GET'])
+@main.route('/', methods=['GET'])
+@query_budget(3)
+@page_cache.cached('venues', 'artists', 'shows')
 def index():
-    recently_artists = Artist.query.order_by(desc('id')).limit(10)
-    recently_venues = Venue.query.order_by(desc('id')).limit(10)
+    recently_artists = Artist.query.filter(live(Artist)).order_by(desc('id')).limit(10)
+    recently_venues = Venue.query.filter(live(Venue)).order_by(desc('id')).limit(10)
+    busiest_venues = Venue.query.filter(live(Venue), Venue.upcoming_shows_count > 0).order_by(
+        Venue.upcoming_shows_count.desc(), Venue.id).limit(10).all()
     return render_template('pages/home.html',
                            recently_artists=recently_artists,
-                           recently_venues=recently_venues)
+                           recently_venues=recently_venues,
+                           busiest_venues=busiest_venues)
 
 
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues', methods=['GET'])
+@main.route('/venues', methods=['GET'])
+@query_budget(1)
+@page_cache.cached('venues')
 def venues():
-    data = []
-    areas = db.session.query(Venue.city, Venue.state_id).distinct()
-    for area in areas:
-        city = area.city
-        state = area.state_id
-        venues_list = Venue.query.filter_by(city=city, state_id=state).all()
-        venue_data = []
-        for venue in venues_list:
-            venue_data.append({
-                "id": venue.id,
-                "name": venue.name,
-            })
-        data.append({
-            "city": city,
-            "state": State.query.get(state).code,
-            "venues": venue_data
-        })
+    data = venue_areas()
     return render_template('pages/venues.html', areas=data)
 
 
-@app.route('/venues/search', methods=['POST'])
+@main.route('/venues/search', methods=['POST'])
+@query_budget(1)
 def search_venues():
     search_term = request.form.get('search_term')
-    venues = Venue.query.order_by(Venue.name)
-    venues = venues.filter(Venue.name.ilike(f'%{search_term}%'))
-
-    response = {
-        "count": venues.count(),
-        "data": venues
-    }
+    page = request.form.get('page', 1, type=int)
+    response = full_text_search(Venue, search_term, page)
     return render_template('pages/search_venues.html', results=response,
                            search_term=request.form.get('search_term', ''))
 
 
-@app.route('/venues/<int:venue_id>', methods=['GET'])
+@main.route('/venues/<int:venue_id>', methods=['GET'])
+@query_budget(2)
 def show_venue(venue_id):
-    venue = Venue.query.get(venue_id)
+    venue = Venue.query.options(
+        joinedload(Venue.genres),
+        joinedload(Venue.state)
+    ).get(venue_id)
+    if venue is None or venue.deleted_at is not None:
+        abort(404)
 
-    past_shows = db.session.query(
-            Artist.id.label("artist_id"),
-            Artist.name.label("artist_name"),
-            Artist.image_link.label("artist_image_link"),
-            Show.start_time
-        ).filter(
-            Show.venue_id == venue_id,
-            Show.artist_id == Artist.id,
-            Show.start_time < datetime.utcnow()
-        ).all()
-
-    upcoming_shows = db.session.query(
-            Artist.id.label("artist_id"),
-            Artist.name.label("artist_name"),
-            Artist.image_link.label("artist_image_link"),
-            Show.start_time
-        ).filter(
-            Show.venue_id == venue_id,
-            Show.artist_id == Artist.id,
-            Show.start_time > datetime.now()
-        ).all()
+    past_shows, upcoming_shows = split_shows(venue_shows(venue_id))
 
     data = {
         "id": venue_id,
@@ -148,16 +164,17 @@ def show_venue(venue_id):
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
+@query_budget(0)
 def create_venue_form():
     form = VenueForm(request.form)
-    form.genres.choices = [(g.id, g.name) for g in Genre.query.order_by('name').all()]
-    form.state.choices = [(s.id, s.code) for s in State.query.order_by('code').all()]
+    form.genres.choices = reference_data.genre_choices()
+    form.state.choices = reference_data.state_choices()
 
     return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
     form = VenueForm(request.form)
 
@@ -176,26 +193,21 @@ def create_venue_submission():
                 seeking_description=form.seeking_description.data
             )
 
-            genres = []
-            for genre_id in form.genres.data:
-                genres.append(Genre.query.get(genre_id))
-
-            venue.genres = genres
-
-            for g in genres:
-                g.venues = [venue]
-
             db.session.add(venue)
+            db.session.flush()
+            set_genres(venue_genre, 'venue_id', venue.id,
+                       reference_data.genre_ids(form.genres.data), new=True)
             db.session.commit()
-
-            flash('Venue ' + form.name.data + ' was successfully listed!')
-            return redirect(url_for('index'))
         except:
             db.session.rollback()
             flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
-            return redirect(url_for('create_venue_submission'))
+            return redirect(url_for('main.create_venue_submission'))
         finally:
             db.session.close()
+        page_cache.invalidate('venues')
+
+        flash('Venue ' + form.name.data + ' was successfully listed!')
+        return redirect(url_for('main.index'))
     else:
         for field, errors in form.errors.items():  # https://stackabuse.com/flask-form-validation-with-flask-wtf/
             flash(field + ': ' + '|'.join(errors))
@@ -203,78 +215,59 @@ def create_venue_submission():
     return render_template('pages/home.html')
 
 
-@app.route('/venues/<int:venue_id>/delete', methods=['POST'])
+@main.route('/venues/<int:venue_id>/delete', methods=['POST'])
+@query_budget(3)
 def delete_venue(venue_id):
-    venue = Venue.query.get(venue_id)
+    # Set-based: the venue's shows and genre links go by ON DELETE CASCADE.
     try:
-        for g in venue.genres:
-            db.session.delete(g)
-
-        for sh in venue.shows:
-            db.session.delete(sh)
-        db.session.delete(venue)
+        deleted = deletion.delete(Venue, venue_id, soft=current_app.config['SOFT_DELETE'])
         db.session.commit()
-
-        flash('Venue was successfully deleted!')
-        return redirect(url_for('venues'))
-    except Exception as e:
-        print(e)
+    except:
         db.session.rollback()
-        flash('An error occurred. Venue ' + request.form['name'] + ' could not be deleted.')
+        flash(f'An error occurred. Venue {venue_id} could not be deleted.')
+        return redirect(url_for('main.show_venue', venue_id=venue_id))
     finally:
         db.session.close()
+    if not deleted:
+        abort(404)
+    page_cache.invalidate('venues', 'artists', 'shows')
 
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    flash('Venue was successfully deleted!')
+    return redirect(url_for('main.venues'))
 
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@main.route('/artists')
+@query_budget(1)
+@page_cache.cached('artists')
 def artists():
-    data = Artist.query.order_by('id').all()
+    data = Artist.query.filter(live(Artist)).order_by('id').all()
 
     return render_template('pages/artists.html', artists=data)
 
 
-@app.route('/artists/search', methods=['POST'])
+@main.route('/artists/search', methods=['POST'])
+@query_budget(1)
 def search_artists():
     search_term = request.form.get('search_term')
-    artist = Artist.query.order_by(Artist.name)
-    artist = artist.filter(Artist.name.ilike(f'%{search_term}%'))
-
-    response = {
-        "count": artist.count(),
-        "data": artist
-    }
+    page = request.form.get('page', 1, type=int)
+    response = full_text_search(Artist, search_term, page)
     return render_template('pages/search_artists.html', results=response,
                            search_term=request.form.get('search_term', ''))
 
 
-@app.route('/artists/<int:artist_id>')
+@main.route('/artists/<int:artist_id>')
+@query_budget(2)
 def show_artist(artist_id):
-    artist = Artist.query.get(artist_id)
+    artist = Artist.query.options(
+        joinedload(Artist.genres),
+        joinedload(Artist.state)
+    ).get(artist_id)
+    if artist is None or artist.deleted_at is not None:
+        abort(404)
 
-    past_shows = db.session.query(
-            Venue.id.label("venue_id"),
-            Venue.name.label("venue_name"),
-            Venue.image_link.label("venue_image_link"),
-            Show.start_time
-        ).filter(
-            Show.artist_id == artist_id,
-            Show.venue_id == Venue.id,
-            Show.start_time < datetime.now()
-        ).all()
-
-    upcoming_shows = db.session.query(
-            Venue.id.label("venue_id"),
-            Venue.name.label("venue_name"),
-            Venue.image_link.label("venue_image_link"),
-            Show.start_time
-        ).filter(
-            Show.artist_id == artist_id,
-            Show.venue_id == Venue.id,
-            Show.start_time > datetime.now()
-        ).all()
+    past_shows, upcoming_shows = split_shows(artist_shows(artist_id))
 
     data = {
         "id": artist_id,
@@ -297,33 +290,53 @@ def show_artist(artist_id):
     return render_template('pages/show_artist.html', artist=data)
 
 
+@main.route('/artists/<int:artist_id>/delete', methods=['POST'])
+@query_budget(3)
+def delete_artist(artist_id):
+    # Set-based: the artist's shows and genre links go by ON DELETE CASCADE.
+    try:
+        deleted = deletion.delete(Artist, artist_id, soft=current_app.config['SOFT_DELETE'])
+        db.session.commit()
+    except:
+        db.session.rollback()
+        flash(f'An error occurred. Artist {artist_id} could not be deleted.')
+        return redirect(url_for('main.show_artist', artist_id=artist_id))
+    finally:
+        db.session.close()
+    if not deleted:
+        abort(404)
+    page_cache.invalidate('venues', 'artists', 'shows')
+
+    flash('Artist was successfully deleted!')
+    return redirect(url_for('main.artists'))
+
+
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@query_budget(2)
 def edit_artist(artist_id):
     artist = Artist.query.get(artist_id)
+    if artist is None or artist.deleted_at is not None:
+        abort(404)
     form = ArtistForm(state=artist.state_id)
     form.genres.data = [g.id for g in artist.genres]
-    form.genres.choices = [(g.id, g.name) for g in Genre.query.order_by('name').all()]
-    form.state.choices = [(s.id, s.code) for s in State.query.order_by('code').all()]
+    form.genres.choices = reference_data.genre_choices()
+    form.state.choices = reference_data.state_choices()
 
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
     form = ArtistForm(request.form)
     if form.validate_on_submit():
         try:
             artist = Artist.query.get(artist_id)
 
-            genres = []
-            for genre_id in form.genres.data:
-                genres.append(Genre.query.get(genre_id))
-            artist.genres = genres
-
-            for g in genres:
-                g.artists = [artist]
+            if set_genres(artist_genre, 'artist_id', artist_id,
+                          reference_data.genre_ids(form.genres.data)):
+                artist.updated_at = version_stamp()
 
             artist.name = form.name.data
             artist.city = form.city.data
@@ -336,47 +349,47 @@ def edit_artist_submission(artist_id):
             artist.seeking_description = form.seeking_description.data
 
             db.session.commit()
-
-            flash('Artist was successfully edited!')
-            return redirect(url_for('show_artist', artist_id=artist_id))
         except:
             db.session.rollback()
             flash('An error occurred. Artist could not be edited.')
-            return redirect(url_for('edit_artist', artist_id=artist_id))
+            return redirect(url_for('main.edit_artist', artist_id=artist_id))
         finally:
             db.session.close()
+        page_cache.invalidate('artists')
+
+        flash('Artist was successfully edited!')
+        return redirect(url_for('main.show_artist', artist_id=artist_id))
     else:
         for field, errors in form.errors.items():  # https://stackabuse.com/flask-form-validation-with-flask-wtf/
             flash(field + ': ' + '|'.join(errors))
 
-    return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('main.show_artist', artist_id=artist_id))
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@query_budget(2)
 def edit_venue(venue_id):
     venue = Venue.query.get(venue_id)
+    if venue is None or venue.deleted_at is not None:
+        abort(404)
     form = VenueForm(state=venue.state_id)
     form.genres.data = [g.id for g in venue.genres]
-    form.genres.choices = [(g.id, g.name) for g in Genre.query.order_by('name').all()]
-    form.state.choices = [(s.id, s.code) for s in State.query.order_by('code').all()]
+    form.genres.choices = reference_data.genre_choices()
+    form.state.choices = reference_data.state_choices()
 
     return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
     form = VenueForm(request.form)
     if form.validate_on_submit():
         try:
             venue = Venue.query.get(venue_id)
 
-            genres = []
-            for genre_id in form.genres.data:
-                genres.append(Genre.query.get(genre_id))
-            venue.genres = genres
-
-            for g in genres:
-                g.venues = [venue]
+            if set_genres(venue_genre, 'venue_id', venue_id,
+                          reference_data.genre_ids(form.genres.data)):
+                venue.updated_at = version_stamp()
 
             venue.name = form.name.data
             venue.city = form.city.data
@@ -390,33 +403,35 @@ def edit_venue_submission(venue_id):
             venue.seeking_description = form.seeking_description.data
 
             db.session.commit()
-
-            flash('Venue was successfully edited!')
-            return redirect(url_for('show_venue', venue_id=venue_id))
         except:
             db.session.rollback()
             flash('An error occurred. Venue could not be edited.')
-            return redirect(url_for('edit_venue', venue_id=venue_id))
+            return redirect(url_for('main.edit_venue', venue_id=venue_id))
         finally:
             db.session.close()
+        page_cache.invalidate('venues')
+
+        flash('Venue was successfully edited!')
+        return redirect(url_for('main.show_venue', venue_id=venue_id))
     else:
         for field, errors in form.errors.items():  # https://stackabuse.com/flask-form-validation-with-flask-wtf/
             flash(field + ': ' + '|'.join(errors))
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('main.show_venue', venue_id=venue_id))
 
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
+@query_budget(0)
 def create_artist_form():
     form = ArtistForm()
-    form.genres.choices = [(g.id, g.name) for g in Genre.query.order_by('name').all()]
-    form.state.choices = [(s.id, s.code) for s in State.query.order_by('code').all()]
+    form.genres.choices = reference_data.genre_choices()
+    form.state.choices = reference_data.state_choices()
     return render_template('forms/new_artist.html', form=form)
 
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
     form = ArtistForm(request.form)
 
@@ -434,26 +449,21 @@ def create_artist_submission():
                 seeking_description=form.seeking_description.data
             )
 
-            genres = []
-            for genre_id in form.genres.data:
-                genres.append(Genre.query.get(genre_id))
-
-            artist.genres = genres
-
-            for g in genres:
-                g.artists = [artist]
-
             db.session.add(artist)
+            db.session.flush()
+            set_genres(artist_genre, 'artist_id', artist.id,
+                       reference_data.genre_ids(form.genres.data), new=True)
             db.session.commit()
-
-            flash('Artist ' + form.name.data + ' was successfully listed!')
-            return redirect(url_for('index'))
         except:
             db.session.rollback()
             flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
-            return redirect(url_for('create_artist_form'))
+            return redirect(url_for('main.create_artist_form'))
         finally:
             db.session.close()
+        page_cache.invalidate('artists')
+
+        flash('Artist ' + form.name.data + ' was successfully listed!')
+        return redirect(url_for('main.index'))
     else:
         for field, errors in form.errors.items():  # https://stackabuse.com/flask-form-validation-with-flask-wtf/
             flash(field + ': ' + '|'.join(errors))
@@ -464,77 +474,150 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@main.route('/shows')
+@query_budget(1)
+@page_cache.cached('shows', 'venues', 'artists')
 def shows():
-    shows_list = Show.query.order_by('start_time').all()
+    # ?from=&to= (dates), &state=, &city=, &genre= narrow the listing.
+    try:
+        filters = parse_show_filters(request.args)
+        rows, next_cursor = show_page(request.args.get('after'), current_app.config['SHOWS_PER_PAGE'],
+                                      filters=filters)
+    except ValueError:
+        abort(400)
+
     data = []
-    for sh in shows_list:
+    for sh in rows:
         item = {
+            "id": sh.id,
+            "updated_at": sh.updated_at,
             "venue_id": sh.venue_id,
-            "venue_name": sh.venue.name,
+            "venue_name": sh.venue_name,
+            "venue_updated_at": sh.venue_updated_at,
             "artist_id": sh.artist_id,
-            "artist_name": sh.artist.name,
-            "artist_image_link": sh.artist.image_link,
-            "start_time": str(sh.start_time)
+            "artist_name": sh.artist_name,
+            "artist_image_link": sh.artist_image_link,
+            "artist_updated_at": sh.artist_updated_at,
+            "start_time": sh.start_time
         }
         data.append(item)
-    return render_template('pages/shows.html', shows=data)
+    filter_args = {k: v for k, v in request.args.items() if k in SHOW_FILTER_ARGS and v}
+    return render_template('pages/shows.html', shows=data, next_cursor=next_cursor, filters=filter_args,
+                           states=reference_data.state_choices(), genres=reference_data.genre_choices())
 
 
-@app.route('/shows/create')
+@main.route('/shows/create')
 def create_shows():
     # renders form. do not touch.
     form = ShowForm()
     return render_template('forms/new_show.html', form=form)
 
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
     form = ShowForm(request.form)
     if form.validate_on_submit():
         try:
             show = Show(
-                artist_id=form.artist_id.data,
-                venue_id=form.venue_id.data,
-                start_time=form.start_time.data
+                artist_id=int(form.artist_id.data),
+                venue_id=int(form.venue_id.data),
+                start_time=form.start_time.data,
+                end_time=form.end_time
             )
 
+            if not deletion.live_ids(Venue, [show.venue_id]):
+                flash(f'There is no venue {show.venue_id}.')
+                return redirect(url_for('main.create_shows'))
+            if not deletion.live_ids(Artist, [show.artist_id]):
+                flash(f'There is no artist {show.artist_id}.')
+                return redirect(url_for('main.create_shows'))
+
+            booked = scheduling.conflicts(show.venue_id, show.artist_id, show.start_time, show.end_time)
+            if booked:
+                for kind, other in booked:
+                    flash(f'The {kind} is already booked from {format_datetime(other.start_time)} '
+                          f'to {format_datetime(other.end_time)} (show {other.id}).')
+                return redirect(url_for('main.create_shows'))
+
             db.session.add(show)
             db.session.commit()
-
-            flash('Show was successfully listed!')
-            return redirect(url_for('index'))
+        except IntegrityError as e:
+            # Lost a race with another booking (the Postgres exclusion constraint).
+            db.session.rollback()
+            kind = scheduling.exclusion_violation(e)
+            flash(f'The {kind} is already booked at that time.' if kind
+                  else 'An error occurred. Show could not be listed.')
+            return redirect(url_for('main.create_shows'))
         except:
             db.session.rollback()
             flash('An error occurred. Show could not be listed.')
-            return redirect(url_for('create_shows'))
+            return redirect(url_for('main.create_shows'))
         finally:
             db.session.close()
+        page_cache.invalidate('shows')
+
+        flash('Show was successfully listed!')
+        return redirect(url_for('main.index'))
     else:
         for field, errors in form.errors.items():  # https://stackabuse.com/flask-form-validation-with-flask-wtf/
             flash(field + ': ' + '|'.join(errors))
-    return redirect(url_for('create_shows'))
+    return redirect(url_for('main.create_shows'))
 
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+# ----------------------------------------------------------------------------#
+# App factory.
+# ----------------------------------------------------------------------------#
+
+def create_app(config_object='config'):
+    # No I/O here: workers boot without touching the database. Tables and
+    # reference data are set up by `flask init` (or `flask db upgrade`
+    # followed by `flask db seed`), and reference data loads on first use.
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', pooling.engine_options(app.config))
+    # Before any extension touches app.jinja_env.
+    templating.init_app(app)
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    page_cache.init_app(app)
+    fragment_cache.init_app(app)
+    instrumentation.init_app(app)
+    pooling.init_app(app)
+    assets.init_app(app)
+    thumbnails.init_app(app)
+
+    app.register_blueprint(main)
+    app.register_blueprint(api.bp)
+    app.register_blueprint(exporter.bp)
+    app.register_blueprint(importer.bp)
+    app.register_blueprint(counters.bp)
+    app.cli.add_command(seed.init_command)
+    # Swaps in the async venue/artist pages when ASYNC_DETAIL_VIEWS is set.
+    async_views.init_app(app)
+
+    if not app.debug:
+        file_handler = FileHandler('error.log')
+        file_handler.setFormatter(
+            Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info('errors')
+
+    return app
+
 
 # ----------------------------------------------------------------------------#
 # Launch.
@@ -542,10 +625,10 @@ if not app.debug:
 
 # # Default port:
 # if __name__ == '__main__':
-#     app.run()
+#     create_app().run()
 
 # Or specify port manually:
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='127.0.0.1', port=port)
+    create_app().run(host='127.0.0.1', port=port)
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+
+import click
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+
+# `flask assets build` copies static/ into static/dist/ under content-hashed
+# names (css/main.css -> css/main.1a2b3c4d5e6f.css), writes gzip and, when
+# the brotli package is installed, brotli variants of the text assets, and
+# records both in static/dist/manifest.json. Templates link assets with
+# asset_url(); /assets/ serves the hashed files, picking a precompressed
+# variant by Accept-Encoding, as immutable for a year. A changed file gets
+# a new name, so browsers never revalidate an unchanged one.
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.ttf', '.otf', '.eot'}
+# Checked in order of preference against the request's Accept-Encoding.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# A variant is kept only if it saves more than this fraction of the bytes.
+MIN_SAVING = 0.05
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+bp = Blueprint('assets', __name__, cli_group='assets')
+bp.cli.help = 'Build fingerprinted, precompressed static assets.'
+
+
+def _hashed_name(path, content):
+    stem, ext = posixpath.splitext(path)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+
+def _rewrite_css(path, content, names):
+    """Point relative url()s of a stylesheet at the hashed files."""
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        quote, url = match.groups()
+        # Keep ?query and #fragment suffixes (the IE font hacks use both).
+        cut = min([i for i in (url.find('?'), url.find('#')) if i >= 0] or [len(url)])
+        target, suffix = url[:cut], url[cut:]
+        if not target or ':' in target or target.startswith('/'):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(base, target))
+        if resolved not in names:
+            return match.group(0)
+        hashed = posixpath.relpath(names[resolved], base)
+        return f'url({quote}{hashed}{suffix}{quote})'
+
+    return CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+
+def _compressors():
+    compressors = [('gzip', '.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        return compressors, False
+    return [('br', '.br', lambda data: brotli.compress(data, quality=11))] + compressors, True
+
+
+def build(static_folder, echo=click.echo):
+    """Fingerprint and precompress every file under `static_folder` into
+    its dist/ directory and write the manifest. Returns the manifest.
+
+    Earlier builds are left in place: pages cached before a deploy keep
+    pointing at files that still exist.
+    """
+    dist = os.path.join(static_folder, DIST)
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder and DIST in dirs:
+            dirs.remove(DIST)
+        for name in files:
+            if not name.startswith('.'):
+                full = os.path.join(root, name)
+                sources.append(os.path.relpath(full, static_folder).replace(os.sep, '/'))
+
+    compressors, has_brotli = _compressors()
+    names, encodings = {}, {}
+    before = after = 0
+    # Stylesheets last, so the files they reference already have their names.
+    for path in sorted(sources, key=lambda p: (p.endswith('.css'), p)):
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = f.read()
+        if path.endswith('.css'):
+            content = _rewrite_css(path, content, names)
+        hashed = _hashed_name(path, content)
+        names[path] = hashed
+
+        target = os.path.join(dist, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+
+        smallest = len(content)
+        if posixpath.splitext(path)[1].lower() in COMPRESSIBLE:
+            for encoding, suffix, compress in compressors:
+                compressed = compress(content)
+                if len(compressed) <= len(content) * (1 - MIN_SAVING):
+                    with open(target + suffix, 'wb') as f:
+                        f.write(compressed)
+                    encodings.setdefault(hashed, []).append(encoding)
+                    smallest = min(smallest, len(compressed))
+        before += len(content)
+        after += smallest
+
+    manifest = {'assets': names, 'encodings': encodings}
+    with open(os.path.join(dist, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(os.path.join(dist, MANIFEST + '.tmp'), os.path.join(dist, MANIFEST))
+
+    echo(f'{len(names)} assets: {before / 1024:.0f} KiB, {after / 1024:.0f} KiB over the wire')
+    if not has_brotli:
+        echo('brotli is not installed; wrote gzip variants only.')
+    return manifest
+
+
+class Assets:
+    """Maps logical static paths to their fingerprinted names. The manifest
+    is read on first use, not at startup."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_FINGERPRINT', True)
+        app.add_template_global(asset_url)
+        app.register_blueprint(bp)
+
+    def manifest(self):
+        manifest = self._manifest
+        if manifest is None:
+            path = os.path.join(current_app.static_folder, DIST, MANIFEST)
+            try:
+                with open(path) as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                # Not built: serve from static/ as before.
+                manifest = {'assets': {}, 'encodings': {}}
+            with self._lock:
+                self._manifest = manifest
+        return manifest
+
+    def reload(self):
+        with self._lock:
+            self._manifest = None
+
+
+assets = Assets()
+
+
+def asset_url(filename):
+    """URL of a static file: its fingerprinted copy when built, else the
+    plain static URL."""
+    if current_app.config['ASSETS_FINGERPRINT']:
+        hashed = assets.manifest()['assets'].get(filename)
+        if hashed:
+            return url_for('assets.asset', filename=hashed)
+    return url_for('static', filename=filename)
+
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    available = assets.manifest()['encodings'].get(filename, ())
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    dist = os.path.join(current_app.static_folder, DIST)
+    for encoding, suffix in ENCODINGS:
+        if encoding in available and request.accept_encodings[encoding]:
+            response = send_from_directory(dist, filename + suffix, mimetype=mimetype,
+                                           download_name=posixpath.basename(filename))
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(dist, filename, mimetype=mimetype)
+    if available:
+        response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+@bp.cli.command('build')
+def build_command():
+    """Fingerprint and precompress static/ into static/dist/."""
+    build(current_app.static_folder)
+    assets.reload()
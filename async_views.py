@@ -0,0 +1,197 @@
+import asyncio
+import os
+import threading
+
+from flask import abort, render_template
+from sqlalchemy.exc import NoSuchModuleError
+from sqlalchemy.pool import NullPool
+
+from deletion import live
+from instrumentation import query_budget
+from models import db, Venue, Artist, venue_genre, artist_genre
+from queries import venue_shows_statement, artist_shows_statement, split_shows
+from reference import reference_data
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_url(url):
+    """The async-driver equivalent of a sync SQLAlchemy URL."""
+    scheme, sep, rest = url.partition('://')
+    dialect = scheme.split('+')[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise RuntimeError(f'No async driver configured for {dialect!r}')
+    return ASYNC_DRIVERS[dialect] + sep + rest
+
+
+def async_engine_options(config, url):
+    if not url.startswith('postgresql'):
+        return {}
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    connect_args = {}
+    if config['DB_PGBOUNCER']:
+        # asyncpg prepares every statement; PgBouncer in transaction mode
+        # may run the next one on a different server connection.
+        connect_args['statement_cache_size'] = 0
+        options['poolclass'] = NullPool
+    else:
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+        )
+        if config['DB_STATEMENT_TIMEOUT_MS']:
+            connect_args['server_settings'] = {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+class AsyncDatabase:
+    """Async engine driven by one long-lived event loop per process.
+
+    Flask runs every async view in a new event loop, and pooled asyncio
+    connections cannot move between loops. Running the statements on a
+    loop of our own keeps the pool, and its open connections, across
+    requests; views await the results from their own loop.
+    """
+
+    def __init__(self):
+        self.url = None
+        self.options = {}
+        self.engine = None
+        self.loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.url = app.config['ASYNC_DATABASE_URL'] or async_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        self.options = async_engine_options(app.config, self.url)
+
+    def _start(self):
+        # Started on first use, and again in each forked worker.
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            from sqlalchemy.ext.asyncio import create_async_engine
+            try:
+                self.engine = create_async_engine(self.url, **self.options)
+            except (ImportError, NoSuchModuleError) as e:
+                raise RuntimeError(f'ASYNC_DETAIL_VIEWS cannot load the driver for {self.url.split(":")[0]}: {e}')
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, name='async-db', daemon=True).start()
+            self._pid = os.getpid()
+
+    async def _fetch(self, statement):
+        async with self.engine.connect() as conn:
+            return (await conn.execute(statement)).all()
+
+    async def _gather(self, statements):
+        return await asyncio.gather(*(self._fetch(statement) for statement in statements))
+
+    async def gather(self, *statements):
+        """Run the statements concurrently, each on its own connection, and
+        return their rows in order."""
+        self._start()
+        # The task copies the caller's context, so the request's SQL
+        # instrumentation still sees these statements.
+        future = asyncio.run_coroutine_threadsafe(self._gather(statements), self.loop)
+        return await asyncio.wrap_future(future)
+
+
+async_db = AsyncDatabase()
+
+VENUE_DETAIL_COLUMNS = (
+    Venue.id, Venue.name, Venue.address, Venue.city, Venue.state_id, Venue.phone,
+    Venue.website_link, Venue.facebook_link, Venue.seeking_talent,
+    Venue.seeking_description, Venue.image_link,
+)
+
+ARTIST_DETAIL_COLUMNS = (
+    Artist.id, Artist.name, Artist.city, Artist.state_id, Artist.phone,
+    Artist.website_link, Artist.facebook_link, Artist.seeking_venue,
+    Artist.seeking_description, Artist.image_link,
+)
+
+
+@query_budget(3)
+async def show_venue(venue_id):
+    # The row, its genres and its shows are independent: one round trip.
+    venues, genres, shows = await async_db.gather(
+        db.select(*VENUE_DETAIL_COLUMNS).where(Venue.id == venue_id, live(Venue)),
+        db.select(venue_genre.c.genre_id).where(venue_genre.c.venue_id == venue_id),
+        venue_shows_statement(venue_id),
+    )
+    if not venues:
+        abort(404)
+    venue = venues[0]
+
+    past_shows, upcoming_shows = split_shows(shows)
+
+    data = {
+        "id": venue_id,
+        "name": venue.name,
+        "genres": reference_data.genre_names(g.genre_id for g in genres),
+        "address": venue.address,
+        "city": venue.city,
+        "state": reference_data.state_code(venue.state_id),
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@query_budget(3)
+async def show_artist(artist_id):
+    artists, genres, shows = await async_db.gather(
+        db.select(*ARTIST_DETAIL_COLUMNS).where(Artist.id == artist_id, live(Artist)),
+        db.select(artist_genre.c.genre_id).where(artist_genre.c.artist_id == artist_id),
+        artist_shows_statement(artist_id),
+    )
+    if not artists:
+        abort(404)
+    artist = artists[0]
+
+    past_shows, upcoming_shows = split_shows(shows)
+
+    data = {
+        "id": artist_id,
+        "name": artist.name,
+        "genres": reference_data.genre_names(g.genre_id for g in genres),
+        "city": artist.city,
+        "state": reference_data.state_code(artist.state_id),
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+
+    return render_template('pages/show_artist.html', artist=data)
+
+
+def init_app(app):
+    """Serve the venue and artist pages from the async views when
+    ASYNC_DETAIL_VIEWS is set; call after the sync views are registered."""
+    app.config.setdefault('ASYNC_DETAIL_VIEWS', False)
+    app.config.setdefault('ASYNC_DATABASE_URL', None)
+    if not app.config['ASYNC_DETAIL_VIEWS']:
+        return
+    async_db.init_app(app)
+    app.view_functions['main.show_venue'] = show_venue
+    app.view_functions['main.show_artist'] = show_artist
@@ -0,0 +1,61 @@
+"""Bytes and requests a browser spends on the static assets of a page, on
+the first and on a repeat visit, with plain /static links and with the
+fingerprinted build.
+
+    python benchmarks/assets.py
+
+Runs `flask assets build` first (into static/dist/, which is ignored by
+git). A repeat visit revalidates every asset whose response is not marked
+immutable (a conditional GET answered 304); immutable assets cost nothing.
+"""
+import argparse
+import os
+import re
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+ASSET_LINK = re.compile(r'(?:href|src)="(/(?:static|assets)/[^"]+)"')
+
+
+def visit(client, html, accept_encoding):
+    first_bytes = first_requests = repeat_requests = 0
+    for url in sorted(set(ASSET_LINK.findall(html))):
+        response = client.get(url, headers={'Accept-Encoding': accept_encoding})
+        if response.status_code != 200:
+            continue
+        first_requests += 1
+        first_bytes += len(response.get_data())
+        if 'immutable' not in response.headers.get('Cache-Control', ''):
+            repeat_requests += 1
+    return first_bytes, first_requests, repeat_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--page', default='/no-such-page',
+                        help='page to collect assets from; the default 404 page needs no database')
+    parser.add_argument('--accept-encoding', default='br, gzip')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from app import create_app
+    from assets import assets, build
+
+    app = create_app()
+    build(app.static_folder, echo=lambda message: print(message, file=sys.stderr))
+    assets.reload()
+    client = app.test_client()
+
+    print(f"{'':<14} {'first visit':>12} {'requests':>9} {'repeat visit':>13}")
+    for label, fingerprint in (('plain /static', False), ('fingerprinted', True)):
+        app.config['ASSETS_FINGERPRINT'] = fingerprint
+        html = client.get(args.page).get_data(as_text=True)
+        first_bytes, requests, revalidated = visit(client, html, args.accept_encoding)
+        print(f'{label:<14} {first_bytes / 1024:>9.0f} KiB {requests:>9} {revalidated:>6} requests')
+
+
+if __name__ == '__main__':
+    main()
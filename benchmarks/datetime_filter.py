@@ -0,0 +1,96 @@
+"""Per-row cost of the `datetime` template filter and of rendering the
+/shows page, before and after the filter took native datetimes.
+
+    python benchmarks/datetime_filter.py --rows 1000
+
+"legacy" is the previous filter: str(start_time) re-parsed with dateutil
+and formatted by babel on every call. "cold" is the current filter with
+its memo cleared before each pass (every value distinct), "warm" the same
+values formatted again, as on a re-render. The fragment cache is off, so
+every render formats every row. Needs no database.
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+os.environ['FRAGMENT_CACHE_BACKEND'] = 'null'
+
+import babel.dates  # noqa: E402
+import dateutil.parser  # noqa: E402
+from flask import render_template  # noqa: E402
+
+import app as fyyur  # noqa: E402
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def per_row_us(fn, rows, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) / rows * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 1, 20, 0)
+    times = [start + timedelta(hours=7 * i, minutes=15 * (i % 4)) for i in range(args.rows)]
+    strings = [str(t) for t in times]
+
+    def cold():
+        fyyur._format_datetime.cache_clear()
+        for t in times:
+            fyyur.format_datetime(t, 'full')
+
+    def warm():
+        for t in times:
+            fyyur.format_datetime(t, 'full')
+
+    warm()
+    print(f'filter, per row ({args.rows} rows)')
+    print(f"  legacy  {per_row_us(lambda: [legacy_format_datetime(s, 'full') for s in strings], args.rows, args.repeat):8.2f} us")
+    print(f'  cold    {per_row_us(cold, args.rows, args.repeat):8.2f} us')
+    print(f'  warm    {per_row_us(warm, args.rows, args.repeat):8.2f} us')
+
+    app = fyyur.create_app()
+    shows = [{
+        "id": i, "updated_at": start,
+        "venue_id": 1, "venue_name": "The Musical Hop", "venue_updated_at": start,
+        "artist_id": 2, "artist_name": "Guns N Petals", "artist_image_link": "https://example.com/a.jpg",
+        "artist_updated_at": start,
+        "start_time": t,
+    } for i, t in enumerate(times, 1)]
+    legacy_shows = [dict(show, start_time=str(show["start_time"])) for show in shows]
+
+    def render(data):
+        return lambda: render_template('pages/shows.html', shows=data, next_cursor=None,
+                                       filters={}, states=[], genres=[])
+
+    with app.test_request_context('/shows'):
+        current = render(shows)
+        current()
+        fyyur._format_datetime.cache_clear()
+        new_cold = per_row_us(lambda: (fyyur._format_datetime.cache_clear(), current()), args.rows, args.repeat)
+        new_warm = per_row_us(current, args.rows, args.repeat)
+        app.jinja_env.filters['datetime'] = legacy_format_datetime
+        legacy = per_row_us(render(legacy_shows), args.rows, args.repeat)
+
+    print('/shows render, per row')
+    print(f'  legacy  {legacy:8.2f} us')
+    print(f'  cold    {new_cold:8.2f} us')
+    print(f'  warm    {new_warm:8.2f} us')
+
+
+if __name__ == '__main__':
+    main()
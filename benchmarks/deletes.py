@@ -0,0 +1,104 @@
+"""Statements and time to delete a venue with many shows: the old
+one-show-at-a-time ORM delete against the set-based hard and soft delete.
+
+    python benchmarks/deletes.py --shows 5000
+
+Each mode gets a fresh SQLite database holding one venue with --shows
+shows, spread over --artists artists. Statements are counted at the
+cursor, so cascades done by the database count as nothing.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def populate(db, models, shows, artists):
+    Venue, Artist, Show, venue_genre, artist_genre = models
+    start = datetime(2030, 1, 1, 20)
+    db.session.execute(Venue.__table__.insert(), [{'id': 1, 'name': 'Venue', 'state_id': 1}])
+    db.session.execute(venue_genre.insert(), [{'venue_id': 1, 'genre_id': 1}])
+    db.session.execute(Artist.__table__.insert(), [
+        {'id': i, 'name': f'Artist {i}', 'state_id': 1} for i in range(1, artists + 1)])
+    db.session.execute(artist_genre.insert(), [
+        {'artist_id': i, 'genre_id': 1} for i in range(1, artists + 1)])
+    db.session.execute(Show.__table__.insert(), [{
+        'venue_id': 1,
+        'artist_id': i % artists + 1,
+        'start_time': start + timedelta(hours=i),
+        'end_time': start + timedelta(hours=i, minutes=59),
+    } for i in range(shows)])
+    db.session.commit()
+
+
+def orm_delete(db, Venue, venue_id):
+    # The previous view: every show is loaded and deleted on its own.
+    venue = Venue.query.get(venue_id)
+    for show in venue.shows:
+        db.session.delete(show)
+    db.session.delete(venue)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--shows', type=int, default=5000)
+    parser.add_argument('--artists', type=int, default=200)
+    parser.add_argument('--skip-orm', action='store_true', help='the ORM delete is slow for many shows')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    os.environ['CACHE_BACKEND'] = 'null'
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from sqlalchemy import event
+
+    from app import create_app
+    import counters
+    import deletion
+    from models import db, Venue, Artist, Show, venue_genre, artist_genre
+    from seed import seed_reference_data
+
+    modes = {
+        'hard': lambda: deletion.delete(Venue, 1),
+        'soft': lambda: deletion.delete(Venue, 1, soft=True),
+    }
+    if not args.skip_orm:
+        modes = dict(orm=lambda: orm_delete(db, Venue, 1), **modes)
+
+    print(f"{args.shows} shows over {args.artists} artists")
+    print(f"{'':<6} {'statements':>10} {'ms':>10} {'shows left':>11} {'counters ok':>12}")
+    for mode, delete in modes.items():
+        with tempfile.TemporaryDirectory() as tmpdir:
+            app = create_app()
+            app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+            with app.app_context():
+                db.create_all()
+                seed_reference_data()
+                populate(db, (Venue, Artist, Show, venue_genre, artist_genre), args.shows, args.artists)
+                counters.rebuild()
+                db.session.commit()
+
+                statements = []
+                listener = lambda *a: statements.append(a[2])
+                event.listen(db.engine, 'before_cursor_execute', listener)
+                started = time.perf_counter()
+                delete()
+                db.session.commit()
+                elapsed = (time.perf_counter() - started) * 1000
+                event.remove(db.engine, 'before_cursor_execute', listener)
+
+                left = db.session.query(Show).count()
+                counted = sorted(db.session.query(Artist.id, Artist.shows_count).all())
+                counters.rebuild()
+                ok = counted == sorted(db.session.query(Artist.id, Artist.shows_count).all())
+                db.session.remove()
+                db.engine.dispose()
+        print(f'{mode:<6} {len(statements):>10} {elapsed:>10.1f} {left:>11} {str(ok):>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Render time of tile-heavy pages with the fragment cache off, cold and
+warm, and right after one artist is edited.
+
+    python benchmarks/fragments.py --shows 2000 --per-page 300
+
+Uses a throwaway SQLite database filled by `seed.seed()`. The page cache
+is off, so every request renders; only the tiles and cards wrapped in
+{% cache %} are reused. After the edit only that artist's fragments are
+rendered again, which the "edited" row counts.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def timed(client, path, requests):
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, (path, response.status_code)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--artists', type=int, default=500)
+    parser.add_argument('--shows', type=int, default=2000)
+    parser.add_argument('--per-page', type=int, default=300, help='SHOWS_PER_PAGE')
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmpdir.name, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'null'
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from app import create_app
+    from cache import LRUCache, NullCache, fragment_cache
+    from models import db, Artist, Show
+    from seed import seed, seed_reference_data
+
+    app = create_app()
+    app.config['SHOWS_PER_PAGE'] = args.per_page
+    with app.app_context():
+        db.create_all()
+        seed_reference_data()
+        seed(args.venues, args.artists, args.shows, 0, echo=lambda message: None)
+        venue_id, artist_id = db.session.execute(
+            db.select(Show.venue_id, db.func.min(Show.artist_id))
+            .group_by(Show.venue_id).order_by(db.func.count().desc()).limit(1)
+        ).one()
+        db.session.remove()
+    pages = ['/shows', f'/venues/{venue_id}', f'/artists/{artist_id}']
+    client = app.test_client()
+    for path in pages:
+        client.get(path)  # reference data, compiled templates
+
+    results = {path: {} for path in pages}
+    fragment_cache.backend = NullCache()
+    for path in pages:
+        results[path]['off'] = timed(client, path, args.requests)
+
+    fragment_cache.backend = LRUCache(app.config['FRAGMENT_CACHE_MAX_ENTRIES'], 0)
+    for path in pages:
+        results[path]['cold'] = timed(client, path, 1)
+        results[path]['warm'] = timed(client, path, args.requests)
+
+    entries = len(fragment_cache.backend._data)
+    with app.app_context():
+        artist = Artist.query.get(artist_id)
+        artist.name += ' (edited)'
+        db.session.commit()
+    for path in pages:
+        results[path]['edited'] = timed(client, path, 1)
+    rendered = len(fragment_cache.backend._data) - entries
+
+    print(f"{'median ms':<14} {'off':>8} {'cold':>8} {'warm':>8} {'edited':>8}")
+    for path, row in results.items():
+        print(f"{path:<14} " + ' '.join(f'{row[mode]:>8.2f}' for mode in ('off', 'cold', 'warm', 'edited')))
+    print(f'\n{entries} fragments cached; editing one artist rendered {rendered} again')
+
+
+if __name__ == '__main__':
+    main()
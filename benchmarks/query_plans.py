@@ -0,0 +1,137 @@
+"""Query plans of the venue, artist and show listings with and without the
+composite indexes from migration d5e8f0a2b913.
+
+    DATABASE_URL=postgresql://... python benchmarks/query_plans.py --shows 1000000
+
+Seeds venues, artists and shows, captures the exact statements issued by
+the queries in queries.py, and runs EXPLAIN ANALYZE on each before and after
+dropping the indexes. Everything happens in one transaction that is rolled
+back, so the database is left as it was. DROP INDEX holds an exclusive lock
+on the table until then: do not point this at a live database.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import Show, Venue, db  # noqa: E402
+from queries import artist_shows, show_cursor, show_page, venue_areas, venue_shows  # noqa: E402
+
+INDEXES = [index.name for table in (Show.__table__, Venue.__table__)
+           for index in table.indexes if len(index.columns) > 1]
+
+
+def seed(conn, venues, artists, shows):
+    conn.exec_driver_sql(
+        "INSERT INTO states (code) SELECT 'ZZ' WHERE NOT EXISTS (SELECT 1 FROM states)")
+    conn.exec_driver_sql("""
+        INSERT INTO venues (name, city, state_id, address)
+        SELECT 'bench venue ' || g, 'city ' || (g % 500),
+               (SELECT min(id) FROM states) + g % (SELECT count(*) FROM states),
+               g || ' Bench St'
+        FROM generate_series(1, %(n)s) g""", {'n': venues})
+    conn.exec_driver_sql("""
+        INSERT INTO artists (name, city, state_id)
+        SELECT 'bench artist ' || g, 'city ' || (g % 500), (SELECT min(id) FROM states)
+        FROM generate_series(1, %(n)s) g""", {'n': artists})
+    venue_min, = conn.exec_driver_sql(
+        "SELECT min(id) FROM venues WHERE name LIKE 'bench venue %%'").one()
+    artist_min, = conn.exec_driver_sql(
+        "SELECT min(id) FROM artists WHERE name LIKE 'bench artist %%'").one()
+    # Show g takes the g-th of n slots over three years, so a venue's (or an
+    # artist's) shows are `venues` slots apart and never trip the booking
+    # exclusion constraints. Rows go in in random order, so neither ids nor
+    # the heap follow start_time.
+    conn.exec_driver_sql("""
+        INSERT INTO shows (venue_id, artist_id, start_time, end_time)
+        SELECT venue_id, artist_id, start_time, start_time + interval '1 hour'
+        FROM (
+            SELECT %(venue_min)s + (g * 7919) %% %(venues)s AS venue_id,
+                   %(artist_min)s + (g * 104729) %% %(artists)s AS artist_id,
+                   now() - interval '2 years' + g * (interval '3 years' / %(n)s) AS start_time
+            FROM generate_series(1, %(n)s) g
+            ORDER BY random()
+        ) s""", {
+        'n': shows, 'venues': venues, 'artists': artists,
+        'venue_min': venue_min, 'artist_min': artist_min,
+    })
+    for table in ('states', 'venues', 'artists', 'shows'):
+        conn.exec_driver_sql(f'ANALYZE {table}')
+    return venue_min, artist_min
+
+
+def capture(conn, label, fn, *args):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(conn, 'before_cursor_execute', record)
+    try:
+        fn(*args)
+    finally:
+        event.remove(conn, 'before_cursor_execute', record)
+    return label, statements[-1]
+
+
+def explain(conn, statement, parameters):
+    plan = [row[0] for row in conn.exec_driver_sql(
+        'EXPLAIN (ANALYZE, BUFFERS) ' + statement, parameters)]
+    execution = next((line for line in plan if line.startswith('Execution Time')), '')
+    return plan, execution
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--shows', type=int, default=1000000)
+    parser.add_argument('--venues', type=int, default=5000)
+    parser.add_argument('--artists', type=int, default=20000)
+    parser.add_argument('--verbose', action='store_true', help='print full plans')
+    args = parser.parse_args()
+
+    create_app().app_context().push()
+    if db.engine.dialect.name != 'postgresql':
+        parser.error('query plans are compared on PostgreSQL only')
+
+    conn = db.session.connection()
+    try:
+        started = time.perf_counter()
+        venue_id, artist_id = seed(conn, args.venues, args.artists, args.shows)
+        print(f'seeded {args.shows} shows in {time.perf_counter() - started:.1f}s')
+
+        middle = conn.exec_driver_sql(
+            'SELECT id, start_time FROM shows ORDER BY start_time, id OFFSET %(n)s LIMIT 1',
+            {'n': args.shows // 2}).one()
+        cases = [
+            capture(conn, 'venue page shows', venue_shows, venue_id),
+            capture(conn, 'artist page shows', artist_shows, artist_id),
+            capture(conn, '/shows first page', show_page, None, 30),
+            capture(conn, '/shows middle page', show_page, show_cursor(middle), 30),
+            capture(conn, '/venues areas', venue_areas),
+        ]
+
+        with_indexes = {label: explain(conn, *stmt) for label, stmt in cases}
+        for name in INDEXES:
+            conn.exec_driver_sql(f'DROP INDEX {name}')
+        conn.exec_driver_sql('ANALYZE shows')
+        conn.exec_driver_sql('ANALYZE venues')
+        without_indexes = {label: explain(conn, *stmt) for label, stmt in cases}
+
+        for label, _ in cases:
+            print(f'\n== {label}')
+            for heading, results in (('with indexes', with_indexes), ('without', without_indexes)):
+                plan, execution = results[label]
+                print(f'  {heading:<13} {execution:<28} {plan[0].strip()}')
+                if args.verbose:
+                    print('\n'.join('      ' + line for line in plan))
+    finally:
+        db.session.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Latency, queries per request and throughput of every route, driven
+through the Flask test client.
+
+    python benchmarks/routes.py                           # throwaway SQLite database
+    python benchmarks/routes.py --database postgresql://localhost/fyyur_bench
+    python benchmarks/routes.py --json > baseline.json
+    python benchmarks/routes.py --baseline baseline.json  # exit 1 on a regression
+
+The schema and reference data are created if missing, and an empty
+database is filled with `seed.seed()` first. A Postgres database given
+with --database is written to, so use one set aside for this. The page
+cache is off unless --cache is passed, so the numbers measure the views
+rather than cache hits. Requests run one at a time, so throughput is per
+worker.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# Routes not exercised, and why; anything else missing from cases() is
+# reported so new routes do not go unmeasured.
+SKIPPED = {
+    '/venues/<int:venue_id>/delete': 'destroys seeded data; see benchmarks/deletes.py',
+    '/artists/<int:artist_id>/delete': 'destroys seeded data; see benchmarks/deletes.py',
+    '/export/<filename>': 'streams the whole table; see `flask export`',
+    '/assets/<path:filename>': 'static files; see benchmarks/assets.py',
+    '/thumbnails/<size>': 'fetches remote images; see benchmarks/thumbnails.py',
+}
+
+
+def cases(venue_id, artist_id, genre_id, state_id, free_from):
+    venue_form = {
+        'name': 'Benchmark Hall', 'city': 'San Francisco', 'state': state_id,
+        'address': '1 Market St', 'phone': '415-000-0000', 'genres': genre_id,
+        'image_link': 'https://example.com/venue.jpg',
+    }
+    artist_form = {
+        'name': 'Benchmark Band', 'city': 'San Francisco', 'state': state_id,
+        'phone': '415-000-0000', 'genres': genre_id,
+        'image_link': 'https://example.com/artist.jpg',
+    }
+    # A new evening per request, after every booked show: the same show
+    # twice would be a double booking.
+    slots = itertools.count(1)
+
+    def show_form():
+        start_time = free_from.replace(hour=20, minute=0, second=0, microsecond=0) + timedelta(days=next(slots))
+        return {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': f'{start_time:%Y-%m-%d %H:%M:%S}'}
+
+    def validate_calendar():
+        start_time = free_from.replace(hour=20, minute=0, second=0, microsecond=0)
+        return {'shows': [
+            {'venue_id': venue_id, 'artist_id': artist_id, 'duration': 120,
+             'start_time': (start_time - timedelta(days=day)).isoformat()} for day in range(100)
+        ]}
+
+    # (rule, method, path, form data)
+    return [
+        ('/', 'GET', '/', None),
+        ('/venues', 'GET', '/venues', None),
+        ('/venues/search', 'POST', '/venues/search', {'search_term': 'hall'}),
+        ('/venues/<int:venue_id>', 'GET', f'/venues/{venue_id}', None),
+        ('/venues/create', 'GET', '/venues/create', None),
+        ('/venues/create', 'POST', '/venues/create', venue_form),
+        ('/venues/<int:venue_id>/edit', 'GET', f'/venues/{venue_id}/edit', None),
+        ('/venues/<int:venue_id>/edit', 'POST', f'/venues/{venue_id}/edit', venue_form),
+        ('/artists', 'GET', '/artists', None),
+        ('/artists/search', 'POST', '/artists/search', {'search_term': 'band'}),
+        ('/artists/<int:artist_id>', 'GET', f'/artists/{artist_id}', None),
+        ('/artists/create', 'GET', '/artists/create', None),
+        ('/artists/create', 'POST', '/artists/create', artist_form),
+        ('/artists/<int:artist_id>/edit', 'GET', f'/artists/{artist_id}/edit', None),
+        ('/artists/<int:artist_id>/edit', 'POST', f'/artists/{artist_id}/edit', artist_form),
+        ('/shows', 'GET', '/shows', None),
+        ('/shows', 'GET', '/shows?genre=Jazz&state=CA', None),
+        ('/shows/create', 'GET', '/shows/create', None),
+        ('/shows/create', 'POST', '/shows/create', show_form),
+        ('/api/v1/<resource>', 'GET', '/api/v1/venues', None),
+        ('/api/v1/<resource>/<int:entity_id>', 'GET', f'/api/v1/artists/{artist_id}', None),
+        ('/api/v1/shows', 'GET', '/api/v1/shows', None),
+        ('/api/v1/shows/calendar', 'GET', '/api/v1/shows/calendar?state=CA', None),
+        ('/api/v1/shows/validate', 'POST', '/api/v1/shows/validate', validate_calendar),
+        ('/metrics/db-pool', 'GET', '/metrics/db-pool', None),
+    ]
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _succeeded(client):
+    # Form posts report their outcome only as a flashed message; reading
+    # it also clears it before the next request.
+    with client.session_transaction() as session:
+        messages = [message for _, message in session.pop('_flashes', [])]
+    return not messages or any('successfully' in m for m in messages)
+
+
+def run_case(client, method, path, data, requests, warmup):
+    form = data if callable(data) else lambda: data
+    # The JSON API takes a JSON body, the pages form data.
+    body = 'json' if path.startswith('/api/') else 'data'
+    for _ in range(warmup):
+        client.open(path, method=method, **{body: form()})
+    _succeeded(client)
+    latencies, queries, failures = [], [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = client.open(path, method=method, **{body: form()})
+        latencies.append(time.perf_counter() - t0)
+        queries.append(int(response.headers.get('X-DB-Query-Count', 0)))
+        if response.status_code >= 400 or (method == 'POST' and not _succeeded(client)):
+            failures += 1
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': requests,
+        'failures': failures,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries': statistics.mean(queries),
+        'rps': requests / elapsed,
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: {before['queries']:.1f} -> {result['queries']:.1f} queries")
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', help='SQLAlchemy URL (default: a temporary SQLite file)')
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--cache', action='store_true', help='keep the page cache on')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 slowdown against the baseline (default 0.25)')
+    args = parser.parse_args()
+
+    tmpdir = None
+    if not args.database:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database = 'sqlite:///' + os.path.join(tmpdir.name, 'bench.db')
+    # config.py reads these on import.
+    os.environ['DATABASE_URL'] = args.database
+    os.environ.setdefault('CACHE_BACKEND', 'lru' if args.cache else 'null')
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from app import create_app
+    from models import db, Venue, Show
+    from reference import reference_data
+    from seed import seed, seed_reference_data
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, SQL_DEBUG_HEADERS=True)
+    with app.app_context():
+        db.create_all()
+        seed_reference_data()
+        if not db.session.query(Venue.id).first():
+            seed(args.venues, args.artists, args.shows, args.seed,
+                 echo=lambda message: print('seeded', message, file=sys.stderr))
+        # The busiest venue and one of its artists: the worst case for
+        # the detail pages.
+        venue_id, artist_id = db.session.execute(
+            db.select(Show.venue_id, db.func.min(Show.artist_id))
+            .group_by(Show.venue_id).order_by(db.func.count().desc()).limit(1)
+        ).one()
+        free_from = db.session.execute(
+            db.select(Show.end_time).order_by(Show.end_time.desc()).limit(1)
+        ).scalar()
+        genre_id = reference_data.genre_choices()[0][0]
+        state_id = reference_data.state_choices()[0][0]
+        db.session.remove()
+
+    all_cases = cases(venue_id, artist_id, genre_id, state_id, free_from)
+    covered = {rule for rule, _, _, _ in all_cases} | set(SKIPPED)
+    missing = sorted({r.rule for r in app.url_map.iter_rules() if r.endpoint != 'static'} - covered)
+
+    client = app.test_client()
+    results = {}
+    for rule, method, path, data in all_cases:
+        query = path.partition('?')[2]
+        name = f'{method} {rule}' + (f'?{query}' if query else '')
+        results[name] = run_case(client, method, path, data, args.requests, args.warmup)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'route':<44} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'req/s':>8}")
+        for name, r in results.items():
+            flag = f"  {r['failures']} failed" if r['failures'] else ''
+            print(f"{name:<44} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+                  f"{r['queries']:>8.1f} {r['rps']:>8.0f}{flag}")
+    for rule in missing:
+        print(f'not benchmarked: {rule}', file=sys.stderr)
+
+    problems = [f"{name}: {r['failures']} failed requests" for name, r in results.items() if r['failures']]
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems += compare(results, json.load(f), args.tolerance)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if tmpdir:
+        tmpdir.cleanup()
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
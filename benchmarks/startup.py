@@ -0,0 +1,90 @@
+"""Worker startup cost: importing app.py and calling create_app(), in fresh
+interpreters.
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --max-ms 800   # exit 1 if slower
+
+Each run blocks outbound connections, so create_app() touching the
+database (or Redis) fails the benchmark instead of being timed. The
+cumulative import time of the heaviest dependencies is reported from
+`python -X importtime`.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+WATCHED = ('flask', 'sqlalchemy', 'flask_migrate', 'flask_wtf', 'wtforms',
+           'babel', 'babel.dates', 'dateutil.parser', 'forms', 'models')
+
+CHILD = """
+import json, socket, time
+
+def refuse(self, address):
+    raise OSError('startup must not open connections (%r)' % (address,))
+
+socket.socket.connect = refuse
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported}))
+"""
+
+IMPORTTIME = re.compile(r'import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def run_once():
+    env = dict(os.environ, DATABASE_URL='postgresql://fyyur@127.0.0.1:9/unreachable')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    modules = {}
+    for cumulative, _, name in IMPORTTIME.findall(proc.stderr):
+        if name in WATCHED and name not in modules:
+            modules[name] = int(cumulative) / 1e6
+    return result, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--max-ms', type=float, help='fail if the median startup is slower')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    median = lambda values: statistics.median(values) * 1000
+    results = {
+        'import_ms': median([r['import'] for r, _ in runs]),
+        'create_app_ms': median([r['create_app'] for r, _ in runs]),
+        'modules_ms': {name: median([m.get(name, 0) for _, m in runs]) for name in WATCHED},
+    }
+    results['total_ms'] = results['import_ms'] + results['create_app_ms']
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"import app       {results['import_ms']:8.1f} ms")
+        print(f"create_app()     {results['create_app_ms']:8.1f} ms")
+        print(f"total            {results['total_ms']:8.1f} ms  (median of {args.runs})")
+        print('\ncumulative import time')
+        for name, ms in sorted(results['modules_ms'].items(), key=lambda item: -item[1]):
+            print(f'  {name:<16} {ms:8.1f} ms')
+
+    if args.max_ms is not None and results['total_ms'] > args.max_ms:
+        print(f"startup took {results['total_ms']:.0f} ms (limit {args.max_ms:.0f} ms)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
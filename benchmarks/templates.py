@@ -0,0 +1,104 @@
+"""First-request template cost of a freshly started worker, with templates
+compiled in memory, with an empty shared bytecode cache, and with the
+cache filled by `flask templates compile` at deploy time.
+
+    python benchmarks/templates.py --runs 5
+
+Each run is a fresh interpreter that imports the app, calls create_app()
+and then loads every template, as the first hit of each page would. The
+first render of the 404 page is timed separately, and warm renders with
+auto-reload on (debug) and off (production). Needs no database.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+CHILD = """
+import json, sys, time
+from app import create_app
+
+app = create_app()
+app.config.update(TEMPLATES_AUTO_RELOAD=False)
+client = app.test_client()
+started = time.perf_counter()
+client.get('/no-such-page')
+first_render = time.perf_counter() - started
+with app.app_context():
+    started = time.perf_counter()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    load_all = time.perf_counter() - started
+
+warm = {}
+for auto_reload in (True, False):
+    app.jinja_env.auto_reload = auto_reload
+    started = time.perf_counter()
+    for _ in range(int(sys.argv[1])):
+        client.get('/no-such-page')
+    warm[auto_reload] = (time.perf_counter() - started) / int(sys.argv[1])
+print(json.dumps({'first_render': first_render, 'load_all': load_all,
+                  'warm_reload': warm[True], 'warm_no_reload': warm[False]}))
+"""
+
+PRECOMPILE = """
+import time
+from app import create_app
+from templating import compile_all
+
+app = create_app()
+started = time.perf_counter()
+with app.app_context():
+    compiled, failed = compile_all(app)
+assert not failed, failed
+print(time.perf_counter() - started)
+"""
+
+
+def run(code, cache_dir, *argv):
+    env = dict(os.environ, DATABASE_URL='sqlite://', JINJA_BYTECODE_CACHE_DIR=cache_dir)
+    proc = subprocess.run([sys.executable, '-c', code, *argv], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(proc.stderr.strip())
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--renders', type=int, default=200, help='warm renders per auto-reload setting')
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='jinja-bench-')
+    try:
+        modes = {'in memory': [], 'empty cache': [], 'precompiled': []}
+        for _ in range(args.runs):
+            modes['in memory'].append(run(CHILD, '', str(args.renders)))
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            modes['empty cache'].append(run(CHILD, cache_dir, str(args.renders)))
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        compile_ms = run(PRECOMPILE, cache_dir) * 1000
+        for _ in range(args.runs):
+            modes['precompiled'].append(run(CHILD, cache_dir, str(args.renders)))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    median = lambda runs, key: statistics.median(r[key] for r in runs) * 1000
+    print(f"{'':<14} {'first 404':>10} {'all templates':>14}   (median of {args.runs} fresh workers)")
+    for mode, runs in modes.items():
+        print(f"{mode:<14} {median(runs, 'first_render'):>7.1f} ms {median(runs, 'load_all'):>11.1f} ms")
+    print(f'\n`flask templates compile` at deploy: {compile_ms:.1f} ms')
+    runs = modes['precompiled']
+    print(f"warm render, auto-reload on  {median(runs, 'warm_reload'):.3f} ms")
+    print(f"warm render, auto-reload off {median(runs, 'warm_no_reload'):.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
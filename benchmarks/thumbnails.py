@@ -0,0 +1,106 @@
+"""Cost of the images of a listing page, hot-linked and through the
+/thumbnails proxy, against a local fake origin.
+
+    python benchmarks/thumbnails.py --images 30
+
+The origin is an http.server on 127.0.0.1 serving static/img/front-splash.jpg
+under --images distinct URLs, and counts what it is asked for. Reports the
+bytes a browser downloads, the proxy's latency on a cold and a warm cache,
+the revalidation of a cached thumbnail (304), and the origin requests made.
+With --cache-kib smaller than the thumbnails, shows eviction at work.
+Needs Pillow.
+"""
+import argparse
+import http.server
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+IMAGE = os.path.join(ROOT, 'static', 'img', 'front-splash.jpg')
+
+
+def start_origin(image):
+    hits = []
+
+    class Origin(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(image)))
+            self.end_headers()
+            self.wfile.write(image)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Origin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def fetch_all(client, urls, headers=None):
+    timings, sizes, statuses = [], [], []
+    for url in urls:
+        started = time.perf_counter()
+        response = client.get(url, headers=headers or {})
+        timings.append((time.perf_counter() - started) * 1000)
+        sizes.append(len(response.get_data()))
+        statuses.append(response.status_code)
+    return timings, sizes, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--images', type=int, default=30, help='distinct image links on the page')
+    parser.add_argument('--size', default='tile')
+    parser.add_argument('--cache-kib', type=int, default=None, help='THUMBNAIL_CACHE_MAX_BYTES, in KiB')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from app import create_app
+    from thumbnails import thumbnail_url
+
+    with open(IMAGE, 'rb') as f:
+        image = f.read()
+    server, hits = start_origin(image)
+    links = [f'http://127.0.0.1:{server.server_port}/img/{i}.jpg' for i in range(args.images)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app = create_app()
+        app.config.update(THUMBNAIL_DIR=cache_dir, THUMBNAIL_ALLOW_PRIVATE=True)
+        if args.cache_kib is not None:
+            app.config['THUMBNAIL_CACHE_MAX_BYTES'] = args.cache_kib * 1024
+        with app.test_request_context():
+            urls = [thumbnail_url(link, args.size) for link in links]
+        client = app.test_client()
+
+        cold, sizes, statuses = fetch_all(client, urls)
+        if set(statuses) != {200}:
+            sys.exit(f'proxy answered {sorted(set(statuses))}')
+        origin_cold = len(hits)
+        warm, _, _ = fetch_all(client, urls)
+        etags = [client.get(url).headers['ETag'] for url in urls[:1]]
+        revalidate, _, statuses_304 = fetch_all(client, urls, {'If-None-Match': etags[0]})
+        origin_warm = len(hits) - origin_cold
+        stored = sum(os.path.getsize(os.path.join(d, n)) for d, _, ns in os.walk(cache_dir) for n in ns)
+        server.shutdown()
+
+    print(f'{args.images} images, {len(image) / 1024:.0f} KiB each at the origin')
+    print(f'{"hot-linked":<22} {len(image) * args.images / 1024:>8.0f} KiB downloaded')
+    print(f'{"thumbnails (" + args.size + ")":<22} {sum(sizes) / 1024:>8.0f} KiB downloaded')
+    print(f'{"cold cache":<22} {statistics.median(cold):>8.2f} ms median, {origin_cold} origin requests')
+    print(f'{"warm cache":<22} {statistics.median(warm):>8.2f} ms median, {origin_warm} origin requests')
+    print(f'{"revalidated":<22} {statistics.median(revalidate):>8.2f} ms median, '
+          f'{statuses_304.count(304)} of {len(urls)} answered 304 (same ETag: identical images)')
+    print(f'{"on disk":<22} {stored / 1024:>8.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, request, session
+from jinja2 import TemplateRuntimeError, Undefined, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+log = logging.getLogger(__name__)
+
+# ----------------------------------------------------------------------------#
+# Backends.
+# ----------------------------------------------------------------------------#
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def counter(self, key):
+        return 0
+
+
+class LRUCache:
+    """In-process cache bounded by entry count, with per-entry expiry.
+
+    Counters live apart from the entries so eviction never resets them.
+    """
+
+    def __init__(self, max_entries=512, default_timeout=300):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+
+class LocalRedis:
+    """Stand-in for a Redis client, shared by every instance in the process.
+
+    Implements the handful of commands RedisCache uses, so tests and local
+    runs exercise the shared-backend code path without a Redis server.
+    """
+
+    _store = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url):
+        return cls()
+
+    def get(self, name):
+        with self._lock:
+            item = self._store.get(name)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self._store[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        expires = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._store[name] = (value, expires)
+
+    def delete(self, name):
+        with self._lock:
+            self._store.pop(name, None)
+
+    def incr(self, name):
+        with self._lock:
+            value = int(self._store.get(name, (0, None))[0]) + 1
+            self._store[name] = (str(value).encode(), None)
+            return value
+
+    def flushdb(self):
+        with self._lock:
+            self._store.clear()
+
+
+class RedisCache:
+    """Cache shared by every worker through Redis.
+
+    Fails open: while Redis is unreachable every lookup misses and writes
+    are dropped, so pages are rendered uncached instead of failing.
+    """
+
+    def __init__(self, url, default_timeout=300, key_prefix='fyyur:', socket_timeout=0.5):
+        if url.startswith('local://'):
+            self.client = LocalRedis.from_url(url)
+            self.errors = ()
+        else:
+            try:
+                from redis import Redis
+                from redis.exceptions import RedisError
+            except ImportError:
+                raise RuntimeError("CACHE_BACKEND = 'redis' requires the redis package")
+            self.client = Redis.from_url(url, socket_timeout=socket_timeout,
+                                         socket_connect_timeout=socket_timeout)
+            self.errors = (RedisError,)
+        self.default_timeout = default_timeout
+        self.key_prefix = key_prefix
+
+    def _call(self, default, command, *args, **kwargs):
+        try:
+            return command(*args, **kwargs)
+        except self.errors as e:
+            log.warning('cache: %s failed, continuing without the cache: %s', command.__name__, e)
+            return default
+
+    def get(self, key):
+        return self._call(None, self.client.get, self.key_prefix + key)
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        self._call(None, self.client.set, self.key_prefix + key, value, ex=timeout or None)
+
+    def delete(self, key):
+        self._call(None, self.client.delete, self.key_prefix + key)
+
+    def incr(self, key):
+        # Counters are stored without a TTL; run Redis with a volatile-*
+        # eviction policy so only expiring page entries are evicted.
+        return self._call(0, self.client.incr, self.key_prefix + key)
+
+    def counter(self, key):
+        return int(self._call(None, self.client.get, self.key_prefix + key) or 0)
+
+
+def create_backend(config):
+    backend = config.get('CACHE_BACKEND', 'lru')
+    timeout = config.get('CACHE_DEFAULT_TIMEOUT', 300)
+    if backend == 'redis':
+        return RedisCache(config.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'), timeout)
+    if backend == 'lru':
+        return LRUCache(config.get('CACHE_MAX_ENTRIES', 512), timeout)
+    if backend == 'null':
+        return NullCache()
+    raise RuntimeError(f"Unknown CACHE_BACKEND {backend!r}")
+
+
+# ----------------------------------------------------------------------------#
+# Rendered pages.
+# ----------------------------------------------------------------------------#
+
+
+class PageCache:
+    """Caches rendered GET responses keyed on endpoint and query string.
+
+    Each cached view names the data scopes it renders ('venues', 'artists',
+    ...). A scope has a generation counter that is part of the key, so
+    invalidating a scope retires exactly the pages built from it, in every
+    worker that shares the backend.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or NullCache()
+
+    def init_app(self, app):
+        if app.config.get('CACHE_BACKEND') == 'lru' and app.config.get('WEB_CONCURRENCY', 1) > 1:
+            raise RuntimeError("CACHE_BACKEND = 'lru' serves stale pages with more than one worker; "
+                               "use 'redis'")
+        self.backend = create_backend(app.config)
+        app.extensions['page_cache'] = self
+
+    def _generations(self, scopes):
+        return '.'.join(f'{scope}{self.backend.counter(f"gen:{scope}")}' for scope in scopes)
+
+    def key(self, scopes):
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        digest = hashlib.sha1(args.encode('utf-8')).hexdigest()
+        return f'page:{request.endpoint}:{self._generations(scopes)}:{digest}'
+
+    def cached(self, *scopes, timeout=None):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                # Pages carrying a flashed message are per-user; never share them.
+                if request.method != 'GET' or '_flashes' in session:
+                    return view(*args, **kwargs)
+
+                key = self.key(scopes)
+                body = self.backend.get(key)
+                if body is not None:
+                    return Response(body, mimetype='text/html')
+
+                response = view(*args, **kwargs)
+                if isinstance(response, str):
+                    response = Response(response, mimetype='text/html')
+                if response.status_code == 200:
+                    self.backend.set(key, response.get_data(), timeout)
+                return response
+            return wrapper
+        return decorator
+
+    def memoize(self, name, scopes, params, compute, timeout=None):
+        """compute()'s result, cached like a page but keyed on `params`
+        (a dict of normalized arguments) instead of the raw query string.
+        The result must be JSON-serializable."""
+        args = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(args.encode('utf-8')).hexdigest()
+        key = f'data:{name}:{self._generations(scopes)}:{digest}'
+        cached = self.backend.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        value = compute()
+        self.backend.set(key, json.dumps(value).encode('utf-8'), timeout)
+        return value
+
+    def invalidate(self, *scopes):
+        for scope in scopes:
+            self.backend.incr(f'gen:{scope}')
+
+
+page_cache = PageCache()
+
+
+# ----------------------------------------------------------------------------#
+# Rendered fragments.
+# ----------------------------------------------------------------------------#
+
+
+class FragmentCache:
+    """Caches rendered template fragments, see FragmentCacheExtension.
+
+    Keys carry the ids and version stamps (updated_at) of everything a
+    fragment renders, so an edit retires exactly the fragments of the
+    edited rows, and a cached fragment is never stale. That makes a
+    per-process backend safe: FRAGMENT_CACHE_BACKEND defaults to 'lru',
+    with its own entry budget, apart from the page cache.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or NullCache()
+
+    def init_app(self, app):
+        self.backend = create_backend(dict(
+            app.config,
+            CACHE_BACKEND=app.config.get('FRAGMENT_CACHE_BACKEND', 'lru'),
+            CACHE_MAX_ENTRIES=app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 10000),
+            CACHE_DEFAULT_TIMEOUT=app.config.get('FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60),
+        ))
+        app.extensions['fragment_cache'] = self
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+    def fragment(self, parts, render):
+        args = json.dumps(parts, default=str)
+        key = f'fragment:{hashlib.sha1(args.encode("utf-8")).hexdigest()}'
+        body = self.backend.get(key)
+        if body is not None:
+            return Markup(body.decode('utf-8'))
+        body = render()
+        self.backend.set(key, str(body).encode('utf-8'))
+        return body
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache 'show-tile', show.id, show.updated_at %}...{% endcache %}
+
+    Renders the body once per distinct key and serves it from
+    fragment_cache after that. The key must name every row the body
+    renders, with its version.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_fragment', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _fragment(self, parts, caller):
+        # An undefined part would give unrelated fragments the same key.
+        if any(isinstance(part, Undefined) for part in parts):
+            raise TemplateRuntimeError(f'undefined part in fragment cache key {parts!r}')
+        return fragment_cache.fragment(parts, caller)
+
+
+fragment_cache = FragmentCache()
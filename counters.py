@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import click
+from flask import Blueprint
+from sqlalchemy import event
+
+from cache import page_cache
+from models import db, Venue, Artist, Show
+
+# Venue and Artist carry shows_count, upcoming_shows_count and
+# last_show_time. ORM show writes keep them current in the same
+# transaction; bulk paths call refresh() for the ids they touched.
+# upcoming_shows_count goes stale as shows start, so `flask counters
+# reconcile` should run periodically (cron, every few minutes).
+#
+# Counter writes keep updated_at as it is: it versions the row's content
+# for incremental exports and cached fragments, which counts don't change.
+
+COUNTED = ((Venue, Show.venue_id), (Artist, Show.artist_id))
+# Shows with a soft-deleted artist (venue) do not count for the venue
+# (artist), see deletion.py.
+COUNTERPARTS = {Venue: (Artist, Show.artist_id), Artist: (Venue, Show.venue_id)}
+
+
+def _recomputed(model, fk, now):
+    other, other_fk = COUNTERPARTS[model]
+    listed = ~db.select(other.id).where(other.id == other_fk, other.deleted_at.isnot(None)).exists()
+
+    def shows(*criteria):
+        return db.select(db.func.count()).where(fk == model.id, listed, *criteria).scalar_subquery()
+    return {
+        'shows_count': shows(),
+        'upcoming_shows_count': shows(Show.start_time >= now),
+        'last_show_time': db.select(db.func.max(Show.start_time)).where(fk == model.id, listed).scalar_subquery(),
+    }
+
+
+def _counter_update(table):
+    # Without this, the column's onupdate would stamp now().
+    return db.update(table).values(updated_at=table.c.updated_at)
+
+
+def _recompute(connection, model, fk, *criteria):
+    connection.execute(
+        _counter_update(model.__table__).where(*criteria).values(**_recomputed(model, fk, datetime.now())))
+
+
+def refresh(venue_ids=(), artist_ids=(), connection=None):
+    """Recompute the counters of the given venues and artists."""
+    connection = connection or db.session.connection()
+    for (model, fk), ids in zip(COUNTED, (venue_ids, artist_ids)):
+        if ids:
+            _recompute(connection, model, fk, model.id.in_(set(ids)))
+
+
+def rebuild():
+    connection = db.session.connection()
+    for model, fk in COUNTED:
+        _recompute(connection, model, fk)
+
+
+def reconcile():
+    """Move shows that have started from upcoming to past. Only rows with
+    upcoming shows can be stale, and only those whose count changed are
+    written. Returns the number of rows updated."""
+    now = datetime.now()
+    updated = 0
+    for model, fk in COUNTED:
+        upcoming = _recomputed(model, fk, now)['upcoming_shows_count']
+        updated += db.session.execute(
+            _counter_update(model.__table__).where(
+                model.upcoming_shows_count > 0,
+                model.upcoming_shows_count != upcoming,
+            ).values(upcoming_shows_count=upcoming)
+        ).rowcount
+    return updated
+
+
+@event.listens_for(Show, 'after_insert')
+def _show_inserted(mapper, connection, show):
+    # Increments rather than recounts: no scan of the entity's shows.
+    upcoming = 1 if show.start_time and show.start_time >= datetime.now() else 0
+    for model, fk in COUNTED:
+        table = model.__table__
+        last = db.case(
+            (db.or_(table.c.last_show_time.is_(None), table.c.last_show_time < show.start_time),
+             show.start_time),
+            else_=table.c.last_show_time)
+        connection.execute(_counter_update(table).where(table.c.id == getattr(show, fk.key)).values(
+            shows_count=table.c.shows_count + 1,
+            upcoming_shows_count=table.c.upcoming_shows_count + upcoming,
+            last_show_time=last))
+
+
+@event.listens_for(Show, 'after_delete')
+def _show_deleted(mapper, connection, show):
+    refresh([show.venue_id], [show.artist_id], connection)
+
+
+@event.listens_for(Show, 'after_update')
+def _show_updated(mapper, connection, show):
+    state = db.inspect(show)
+    venue_ids, artist_ids = {show.venue_id}, {show.artist_id}
+    changed = False
+    for attr, ids in (('venue_id', venue_ids), ('artist_id', artist_ids), ('start_time', None)):
+        history = state.attrs[attr].history
+        if history.has_changes():
+            changed = True
+            if ids is not None:
+                ids.update(history.deleted)
+    if changed:
+        refresh(venue_ids, artist_ids, connection)
+
+
+bp = Blueprint('counters', __name__, cli_group='counters')
+bp.cli.help = 'Maintain the per-venue and per-artist show counters.'
+
+
+@bp.cli.command('rebuild')
+def rebuild_command():
+    """Recompute every counter from the shows table."""
+    rebuild()
+    db.session.commit()
+    page_cache.invalidate('venues', 'artists', 'shows')
+    click.echo('Counters rebuilt.')
+
+
+@bp.cli.command('reconcile')
+def reconcile_command():
+    """Move started shows from upcoming to past; run periodically."""
+    updated = reconcile()
+    db.session.commit()
+    if updated:
+        page_cache.invalidate('shows')
+    click.echo(f'{updated} rows updated.')
+
@@ -0,0 +1,56 @@
+import counters
+from models import db, Venue, Artist, Show
+
+# A venue or an artist is deleted with one statement, whatever the number
+# of its shows: the shows and genre links go with it through ON DELETE
+# CASCADE. With SOFT_DELETE the row is kept and stamped deleted_at
+# instead; every read path filters on live() and drops the shows of
+# deleted rows, so they disappear just the same. Soft-deleted shows keep
+# their slots in the venue and artist calendars.
+
+# Model -> (its foreign key on shows, the other one).
+SHOW_KEYS = {
+    Venue: (Show.venue_id, Show.artist_id),
+    Artist: (Show.artist_id, Show.venue_id),
+}
+
+
+def live(model):
+    """Criterion for the venues or artists that are not soft-deleted."""
+    return model.deleted_at.is_(None)
+
+
+def live_ids(model, ids):
+    """The subset of `ids` naming existing, not soft-deleted rows."""
+    if not ids:
+        return set()
+    return set(db.session.execute(
+        db.select(model.id).where(model.id.in_(ids), live(model))
+    ).scalars())
+
+
+def delete(model, entity_id, soft=False):
+    """Delete a venue or an artist, or with `soft` mark it deleted, and
+    recount the shows of the artists (venues) it had shows with. Three
+    statements regardless of the number of shows. Returns False when
+    there is no such row. The caller commits."""
+    fk, other_fk = SHOW_KEYS[model]
+    others = set(db.session.execute(
+        db.select(other_fk).where(fk == entity_id).distinct()
+    ).scalars())
+
+    table = model.__table__
+    if soft:
+        statement = db.update(table).where(
+            table.c.id == entity_id, table.c.deleted_at.is_(None)
+        ).values(deleted_at=db.func.now())
+    else:
+        statement = db.delete(table).where(table.c.id == entity_id)
+    if not db.session.execute(statement).rowcount:
+        return False
+
+    if model is Venue:
+        counters.refresh(artist_ids=others)
+    else:
+        counters.refresh(venue_ids=others)
+    return True
@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, abort, request, stream_with_context
+
+from models import db, Venue, Artist, Show, State, Genre, venue_genre, artist_genre
+
+BATCH_SIZE = 1000
+FORMATS = ('csv', 'jsonl')
+
+bp = Blueprint('exporter', __name__, cli_group=None)
+
+
+def _genre_names(model, association, fk):
+    # ';'-separated, the same shape `flask import` reads back.
+    if db.engine.dialect.name == 'postgresql':
+        names = db.func.string_agg(Genre.name, db.literal_column("';'"))
+    else:
+        names = db.func.group_concat(Genre.name, ';')
+    return db.select(names).select_from(
+        association.join(Genre, association.c.genre_id == Genre.id)
+    ).where(association.c[fk] == model.id).scalar_subquery()
+
+
+def _entity_query(model, association, fk, fields):
+    columns = [model.id, model.name, model.city, State.code.label('state')]
+    columns += [getattr(model, field) for field in fields]
+    # deleted_at tells incremental (--since) consumers about soft deletes.
+    columns += [_genre_names(model, association, fk).label('genres'), model.updated_at, model.deleted_at]
+    return db.session.query(*columns).join(State, model.state_id == State.id)
+
+
+EXPORTS = {
+    'venues': lambda: (Venue, _entity_query(Venue, venue_genre, 'venue_id', (
+        'address', 'phone', 'image_link', 'facebook_link', 'website_link',
+        'seeking_talent', 'seeking_description'
+    ))),
+    'artists': lambda: (Artist, _entity_query(Artist, artist_genre, 'artist_id', (
+        'phone', 'image_link', 'facebook_link', 'website_link',
+        'seeking_venue', 'seeking_description'
+    ))),
+    'shows': lambda: (Show, db.session.query(
+        Show.id, Show.artist_id, Show.venue_id, Show.start_time, Show.end_time, Show.updated_at
+    )),
+}
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(kind, since=None):
+    """Yield (columns, batch) pairs off a server-side cursor."""
+    model, query = EXPORTS[kind]()
+    if since is not None:
+        query = query.filter(model.updated_at >= since)
+    query = query.order_by(model.id).execution_options(stream_results=True).yield_per(BATCH_SIZE)
+
+    columns = [c['name'] for c in query.column_descriptions]
+    batch = []
+    for row in query:
+        batch.append([_value(v) for v in row])
+        if len(batch) == BATCH_SIZE:
+            yield columns, batch
+            batch = []
+    yield columns, batch
+
+
+def export_text(kind, fmt, since=None):
+    """Yield the export as text chunks, one per batch."""
+    header_written = False
+    for columns, batch in export_rows(kind, since):
+        buffer = io.StringIO()
+        if fmt == 'csv':
+            writer = csv.writer(buffer)
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(batch)
+        else:
+            for row in batch:
+                buffer.write(json.dumps(dict(zip(columns, row))))
+                buffer.write('\n')
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _parse_since(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+@bp.route('/export/<filename>')
+def export(filename):
+    # e.g. shows.csv, venues.jsonl, artists.csv.gz
+    kind, _, fmt = filename.partition('.')
+    compress = fmt.endswith('.gz')
+    fmt = fmt[:-3] if compress else fmt
+    if kind not in EXPORTS or fmt not in FORMATS:
+        abort(404)
+    try:
+        since = _parse_since(request.args.get('since'))
+    except ValueError:
+        abort(400)
+
+    chunks = export_text(kind, fmt, since)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if compress:
+        chunks = gzip_chunks(chunks)
+        mimetype = 'application/gzip'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
+
+
+@bp.cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--since', type=click.DateTime(), help='Only rows updated at or after this time.')
+@click.option('-o', '--output', type=click.Path(dir_okay=False), help='Output file (default: stdout).')
+def export_command(kind, fmt, compress, since, output):
+    """Stream venues, artists or shows to CSV or JSONL in constant memory."""
+    chunks = export_text(kind, fmt, since)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    else:
+        chunks = (chunk.encode('utf-8') for chunk in chunks)
+
+    out = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
@@ -3,12 +3,15 @@ from fabric.contrib.console import confirm
 
 # prepare for deployment
 
+# Every route against a throwaway SQLite database; fails on an error
+# response or a view over its query budget. Pass --baseline to also fail
+# on latency regressions.
+BENCHMARK = "python benchmarks/routes.py --requests 20"
+
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q tests && SQL_STRICT=1 " + BENCHMARK, capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -39,9 +42,7 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run -e SQL_STRICT=1 " + BENCHMARK)
 
 
 def deploy():
@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from flask import current_app
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, HiddenField
-from wtforms.validators import DataRequired, URL, regexp, Optional
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, HiddenField, IntegerField
+from wtforms.validators import DataRequired, URL, regexp, Optional, NumberRange, ValidationError
 
 
 class ShowForm(FlaskForm):
@@ -18,8 +19,21 @@ class ShowForm(FlaskForm):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    duration = IntegerField(
+        'duration',
+        validators=[Optional(), NumberRange(min=1)],
+        default=lambda: current_app.config['SHOW_DEFAULT_MINUTES']
+    )
     csrf_token = HiddenField()
 
+    def validate_duration(self, field):
+        if field.data is not None and field.data > current_app.config['SHOW_MAX_MINUTES']:
+            raise ValidationError(f"A show runs for at most {current_app.config['SHOW_MAX_MINUTES']} minutes.")
+
+    @property
+    def end_time(self):
+        return self.start_time.data + timedelta(minutes=self.duration.data or current_app.config['SHOW_DEFAULT_MINUTES'])
+
 
 class VenueForm(FlaskForm):
     name = StringField(
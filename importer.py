@@ -0,0 +1,313 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from itertools import islice
+
+import click
+from flask import Blueprint
+from sqlalchemy import text
+from werkzeug.datastructures import MultiDict
+
+from cache import page_cache
+from counters import refresh
+from deletion import live_ids
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, venue_genre, artist_genre
+from reference import reference_data
+import scheduling
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'on'}
+# What ShowForm.start_time accepts.
+FORM_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+bp = Blueprint('importer', __name__, cli_group=None)
+
+
+def read_records(path):
+    """Stream records from a CSV (header row) or JSONL file."""
+    with open(path, newline='') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _as_list(value):
+    if isinstance(value, list):
+        return value
+    return [v for v in (value or '').split(';') if v.strip()]
+
+
+def _as_flag(value):
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _as_datetime(value):
+    """ISO 8601, as `flask export` writes it, or the form's own format."""
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return datetime.strptime(str(value).strip(), FORM_DATETIME_FORMAT)
+
+
+class Importer:
+    """Validate records with the web form rules and bulk insert them."""
+
+    form_class = None
+    model = None
+    fields = ()
+    flags = ()
+
+    def formdata(self, record):
+        data = MultiDict()
+        for field in self.fields:
+            if record.get(field) not in (None, ''):
+                data[field] = str(record[field])
+        for flag in self.flags:
+            if _as_flag(record.get(flag)):
+                data[flag] = 'y'
+        return data
+
+    def validate(self, record):
+        form = self.form_class(formdata=self.formdata(record), meta={'csrf': False})
+        if not form.validate():
+            return None, form.errors
+        return form, None
+
+    def row(self, form):
+        return {field: form[field].data for field in self.fields + self.flags}
+
+    def check_chunk(self, rows):
+        return rows, []
+
+    def write(self, rows):
+        db.session.execute(self.model.__table__.insert(), rows)
+
+
+class EntityImporter(Importer):
+    """Venues and artists: resolve the state code and genre names in memory."""
+
+    association = None
+    fk = None
+
+    def formdata(self, record):
+        data = super().formdata(record)
+        state_id = reference_data.state_id(str(record.get('state') or ''))
+        if state_id:
+            data['state'] = str(state_id)
+        for genre_id in reference_data.genre_ids_by_name(_as_list(record.get('genres'))):
+            if genre_id:
+                data.add('genres', str(genre_id))
+        return data
+
+    def row(self, form):
+        row = super().row(form)
+        row['state_id'] = form.state.data
+        row['genres'] = form.genres.data
+        return row
+
+    def write(self, rows):
+        # executemany cannot hand generated keys back, so ids are reserved
+        # up front and the genre rows are written in the same round trip.
+        ids = reserve_ids(self.model.__table__.name, len(rows))
+        genre_rows = []
+        for entity_id, row in zip(ids, rows):
+            row['id'] = entity_id
+            genre_rows.extend({self.fk: entity_id, 'genre_id': g} for g in set(row.pop('genres')))
+        db.session.execute(self.model.__table__.insert(), rows)
+        if genre_rows:
+            db.session.execute(self.association.insert(), genre_rows)
+
+
+class VenueImporter(EntityImporter):
+    form_class = VenueForm
+    model = Venue
+    association = venue_genre
+    fk = 'venue_id'
+    fields = ('name', 'city', 'address', 'phone', 'image_link', 'facebook_link',
+              'website_link', 'seeking_description')
+    flags = ('seeking_talent',)
+
+
+class ArtistImporter(EntityImporter):
+    form_class = ArtistForm
+    model = Artist
+    association = artist_genre
+    fk = 'artist_id'
+    fields = ('name', 'city', 'phone', 'image_link', 'facebook_link',
+              'website_link', 'seeking_description')
+    flags = ('seeking_venue',)
+
+
+class ShowImporter(Importer):
+    form_class = ShowForm
+    model = Show
+    fields = ('artist_id', 'venue_id', 'start_time', 'duration')
+
+    def formdata(self, record):
+        data = super().formdata(record)
+        if 'start_time' not in data:
+            return data
+        try:
+            start_time = _as_datetime(data['start_time'])
+        except ValueError:
+            return data  # the form reports it
+        data['start_time'] = start_time.strftime(FORM_DATETIME_FORMAT)
+        if 'duration' not in data and record.get('end_time') not in (None, ''):
+            # An exported show has an end_time instead; the form range-checks
+            # the length, and a non-positive one fails min=1.
+            try:
+                seconds = (_as_datetime(record['end_time']) - start_time).total_seconds()
+            except ValueError:
+                data['duration'] = 'invalid end_time'
+            else:
+                data['duration'] = str(max(0, -(-int(seconds) // 60)))
+        return data
+
+    def row(self, form):
+        return {
+            'artist_id': int(form.artist_id.data),
+            'venue_id': int(form.venue_id.data),
+            'start_time': form.start_time.data,
+            'end_time': form.end_time,
+        }
+
+    def check_chunk(self, rows):
+        # One lookup per referenced table per chunk instead of per row.
+        artist_ids = live_ids(Artist, {row['artist_id'] for _, row in rows})
+        venue_ids = live_ids(Venue, {row['venue_id'] for _, row in rows})
+        valid, errors = [], []
+        for number, row in rows:
+            if row['artist_id'] not in artist_ids:
+                errors.append((number, {'artist_id': ['Unknown artist.']}))
+            elif row['venue_id'] not in venue_ids:
+                errors.append((number, {'venue_id': ['Unknown venue.']}))
+            else:
+                valid.append((number, row))
+
+        # Double bookings, against the calendar and earlier records of the
+        # chunk; the first of two conflicting records wins.
+        booked = scheduling.validate([row for _, row in valid])
+        accepted, kept = set(), []
+        for index, ((number, row), conflicts) in enumerate(zip(valid, booked)):
+            clashes = [c for c in conflicts if 'show_id' in c or c['index'] in accepted]
+            if clashes:
+                errors.append((number, {c['kind'] + '_id': ['Already booked at that time.'] for c in clashes}))
+            else:
+                accepted.add(index)
+                kept.append((number, row))
+        return kept, errors
+
+    def write(self, rows):
+        super().write(rows)
+        refresh({row['venue_id'] for row in rows}, {row['artist_id'] for row in rows})
+
+
+IMPORTERS = {
+    'venues': VenueImporter,
+    'artists': ArtistImporter,
+    'shows': ShowImporter,
+}
+
+
+def reserve_ids(table, count):
+    if db.engine.dialect.name == 'postgresql':
+        return list(db.session.execute(text(
+            "SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"
+        ), {'table': table, 'count': count}).scalars())
+    start = db.session.execute(text(f"SELECT coalesce(max(id), 0) FROM {table}")).scalar()
+    return list(range(start + 1, start + count + 1))
+
+
+def _checkpoint_path(path):
+    return path + '.import-progress'
+
+
+def _read_checkpoint(path):
+    try:
+        with open(_checkpoint_path(path)) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(path, position):
+    tmp = _checkpoint_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(str(position))
+    os.replace(tmp, _checkpoint_path(path))
+
+
+def import_file(kind, path, chunk_size=1000, restart=False, dry_run=False, echo=click.echo):
+    importer = IMPORTERS[kind]()
+    position = 0 if restart or dry_run else _read_checkpoint(path)
+    if position:
+        echo(f'Resuming {path} after record {position}.')
+
+    records = islice(read_records(path), position, None)
+    imported = rejected = 0
+    started = time.perf_counter()
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        rows, errors = [], []
+        for number, record in enumerate(chunk, start=position + 1):
+            form, record_errors = importer.validate(record)
+            if record_errors:
+                errors.append((number, record_errors))
+            else:
+                rows.append((number, importer.row(form)))
+        if rows:
+            rows, chunk_errors = importer.check_chunk(rows)
+            errors.extend(chunk_errors)
+
+        for number, record_errors in sorted(errors, key=lambda e: e[0]):
+            echo(f'record {number}: {record_errors}', err=True)
+        rejected += len(errors)
+
+        if rows and not dry_run:
+            try:
+                importer.write([row for _, row in rows])
+                db.session.commit()
+                page_cache.invalidate(kind)
+            except Exception:
+                db.session.rollback()
+                raise
+        imported += len(rows)
+        position += len(chunk)
+        if not dry_run:
+            _write_checkpoint(path, position)
+
+        elapsed = time.perf_counter() - started
+        echo(f'{kind}: {position} records read, {imported} imported, {rejected} rejected '
+             f'({imported / elapsed:.0f} rows/s)')
+
+    if not dry_run and os.path.exists(_checkpoint_path(path)):
+        os.remove(_checkpoint_path(path))
+    elapsed = time.perf_counter() - started
+    echo(f'Done: {imported} {kind} in {elapsed:.2f}s ({imported / max(elapsed, 1e-9):.0f} rows/s), '
+         f'{rejected} rejected.')
+    return imported, rejected
+
+
+@bp.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=1000, show_default=True, help='Records per transaction.')
+@click.option('--restart', is_flag=True, help='Ignore a saved checkpoint and start from the top.')
+@click.option('--dry-run', is_flag=True, help='Validate only; measures parse and validation throughput.')
+def import_command(kind, path, chunk_size, restart, dry_run):
+    """Bulk import venues, artists or shows from a CSV or JSONL file.
+
+    Venue and artist records name their state by code and their genres by
+    name (';'-separated in CSV, a list in JSONL). Each chunk is committed
+    on its own and checkpointed, so an interrupted import resumes where it
+    stopped when run again.
+    """
+    import_file(kind, path, chunk_size=chunk_size, restart=restart, dry_run=dry_run)
@@ -0,0 +1,134 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\(\s*(?:\?|%\([^)]*\)s|%s)(?:\s*,\s*(?:\?|%\([^)]*\)s|%s))*\s*\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestQueries:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.paused = 0
+
+    def record(self, statement, duration):
+        if self.paused:
+            return
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def duplicates(self, threshold=2):
+        return {fp: n for fp, n in self.fingerprints.items() if n >= threshold}
+
+
+def fingerprint(statement):
+    """Statement text with literals and IN-lists collapsed, so repeats of
+    the same query with different parameters compare equal."""
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _LITERALS.sub('?', statement)
+    return _IN_LISTS.sub('(...)', statement)
+
+
+def current_queries():
+    if not has_request_context():
+        return None
+    if 'sql_queries' not in g:
+        g.sql_queries = RequestQueries()
+    return g.sql_queries
+
+
+@contextmanager
+def unaccounted():
+    """Leave the statements issued inside out of the request's count and
+    budget, for process-wide caches that a cold worker fills once on
+    whichever request happens to need them first."""
+    queries = current_queries()
+    if queries is None:
+        yield
+        return
+    queries.paused += 1
+    try:
+        yield
+    finally:
+        queries.paused -= 1
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    queries = current_queries()
+    if queries is not None:
+        queries.record(statement, time.perf_counter() - started)
+
+
+def query_budget(limit):
+    """Cap the statements a view may issue; see SQL_STRICT."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def init_app(app):
+    app.config.setdefault('SQL_DEBUG_HEADERS', app.debug)
+    app.config.setdefault('SQL_LOG_REQUESTS', False)
+    app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', 5)
+    app.config.setdefault('SQL_QUERY_BUDGET', None)
+    app.config.setdefault('SQL_STRICT', False)
+
+    @app.before_request
+    def start_counting():
+        # g lives as long as the app context, which outlasts the request
+        # when one is already pushed (CLI commands, tests): start afresh.
+        g.sql_queries = RequestQueries()
+
+    @app.after_request
+    def report_queries(response):
+        queries = g.get('sql_queries') or RequestQueries()
+        repeated = queries.duplicates(app.config['SQL_N_PLUS_ONE_THRESHOLD'])
+
+        if app.config['SQL_DEBUG_HEADERS']:
+            response.headers['X-DB-Query-Count'] = str(queries.count)
+            response.headers['X-DB-Time-Ms'] = f'{queries.duration * 1000:.2f}'
+            response.headers['X-DB-Duplicate-Queries'] = str(sum(queries.duplicates().values()))
+
+        if app.config['SQL_LOG_REQUESTS'] or repeated:
+            app.logger.log(logging.WARNING if repeated else logging.INFO, json.dumps({
+                "event": "sql.request",
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "queries": queries.count,
+                "db_time_ms": round(queries.duration * 1000, 2),
+                "repeated": repeated,
+            }))
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', app.config['SQL_QUERY_BUDGET'])
+        if budget is not None and queries.count > budget:
+            message = f'{request.endpoint} issued {queries.count} queries (budget {budget})'
+            if app.config['SQL_STRICT']:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
@@ -0,0 +1,93 @@
+"""full-text search for venues and artists
+
+Revision ID: 5b1d0c2e7a94
+Revises: 2fc3aa0fff05
+Create Date: 2026-10-18 10:12:41.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1d0c2e7a94'
+down_revision = '2fc3aa0fff05'
+branch_labels = None
+depends_on = None
+
+
+SEARCHABLE = [
+    ('venues', 'venue_genre', 'venue_id'),
+    ('artists', 'artist_genre', 'artist_id'),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for table, genre_table, fk in SEARCHABLE:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+        op.execute(f"""
+        CREATE OR REPLACE FUNCTION {table}_search_vector(entity_id integer) RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('simple', coalesce(e.name, '')), 'A') ||
+                   setweight(to_tsvector('simple', coalesce(e.city, '') || ' ' || coalesce(s.code, '')), 'B') ||
+                   setweight(to_tsvector('simple', coalesce(string_agg(g.name, ' '), '')), 'C')
+            FROM {table} e
+            LEFT JOIN states s ON s.id = e.state_id
+            LEFT JOIN {genre_table} eg ON eg.{fk} = e.id
+            LEFT JOIN genres g ON g.id = eg.genre_id
+            WHERE e.id = entity_id
+            GROUP BY e.id, s.code
+        $$ LANGUAGE sql STABLE
+        """)
+        op.execute(f"""
+        CREATE OR REPLACE FUNCTION {table}_search_refresh() RETURNS trigger AS $$
+        BEGIN
+            UPDATE {table} SET search_vector = {table}_search_vector(NEW.id) WHERE id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+        CREATE OR REPLACE FUNCTION {genre_table}_search_refresh() RETURNS trigger AS $$
+        DECLARE
+            entity_id integer := CASE WHEN TG_OP = 'DELETE' THEN OLD.{fk} ELSE NEW.{fk} END;
+        BEGIN
+            UPDATE {table} SET search_vector = {table}_search_vector(entity_id) WHERE id = entity_id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_search_refresh
+        AFTER INSERT OR UPDATE OF name, city, state_id ON {table}
+        FOR EACH ROW EXECUTE PROCEDURE {table}_search_refresh()
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {genre_table}_search_refresh
+        AFTER INSERT OR DELETE ON {genre_table}
+        FOR EACH ROW EXECUTE PROCEDURE {genre_table}_search_refresh()
+        """)
+
+        op.execute(f"UPDATE {table} SET search_vector = {table}_search_vector(id)")
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'],
+                        unique=False, postgresql_using='gin')
+        op.create_index(f'ix_{table}_name_trgm', table, ['name'],
+                        unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    for table, genre_table, fk in SEARCHABLE:
+        op.drop_index(f'ix_{table}_name_trgm', table_name=table)
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.execute(f"DROP TRIGGER IF EXISTS {genre_table}_search_refresh ON {genre_table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_refresh ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {genre_table}_search_refresh()")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_search_refresh()")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector(integer)")
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('search_vector')
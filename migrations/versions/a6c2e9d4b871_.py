@@ -0,0 +1,48 @@
+"""cascading deletes of venues and artists, and soft deletes
+
+Revision ID: a6c2e9d4b871
+Revises: f3a8c6d2e017
+Create Date: 2026-10-18 19:02:51.337104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c2e9d4b871'
+down_revision = 'f3a8c6d2e017'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referenced table): the rows that go with a venue or an
+# artist. Genre references stay restrictive.
+FOREIGN_KEYS = [
+    ('shows', 'venue_id', 'venues'),
+    ('shows', 'artist_id', 'artists'),
+    ('venue_genre', 'venue_id', 'venues'),
+    ('artist_genre', 'artist_id', 'artists'),
+]
+
+
+def _replace_foreign_keys(ondelete):
+    for table, column, referred in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+    for table in ('venues', 'artists'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('deleted_at')
+    _replace_foreign_keys(None)
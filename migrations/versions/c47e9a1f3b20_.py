@@ -0,0 +1,33 @@
+"""updated_at timestamps for incremental exports
+
+Revision ID: c47e9a1f3b20
+Revises: 5b1d0c2e7a94
+Create Date: 2026-10-18 11:02:17.642390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e9a1f3b20'
+down_revision = '5b1d0c2e7a94'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['venues', 'artists', 'shows']
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+            batch_op.create_index(batch_op.f(f'ix_{table}_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_updated_at'))
+            batch_op.drop_column('updated_at')
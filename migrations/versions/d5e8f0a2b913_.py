@@ -0,0 +1,36 @@
+"""composite indexes for show and venue listings
+
+Revision ID: d5e8f0a2b913
+Revises: c47e9a1f3b20
+Create Date: 2026-10-18 13:40:52.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e8f0a2b913'
+down_revision = 'c47e9a1f3b20'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('shows', 'ix_shows_venue_id_start_time', ['venue_id', 'start_time']),
+    ('shows', 'ix_shows_artist_id_start_time', ['artist_id', 'start_time']),
+    ('shows', 'ix_shows_start_time_id', ['start_time', 'id']),
+    ('venues', 'ix_venues_state_id_city', ['state_id', 'city']),
+]
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
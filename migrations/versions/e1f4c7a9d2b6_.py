@@ -0,0 +1,46 @@
+"""per-venue and per-artist show counters
+
+Revision ID: e1f4c7a9d2b6
+Revises: d5e8f0a2b913
+Create Date: 2026-10-18 15:12:40.503817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f4c7a9d2b6'
+down_revision = 'd5e8f0a2b913'
+branch_labels = None
+depends_on = None
+
+
+TABLES = [('venues', 'venue_id'), ('artists', 'artist_id')]
+
+
+def upgrade():
+    for table, fk in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('shows_count', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('last_show_time', sa.DateTime(), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_upcoming_shows_count'), ['upcoming_shows_count'], unique=False)
+
+        # Backfill; `flask counters rebuild` does the same.
+        op.execute(f"""
+            UPDATE {table} SET
+                shows_count = (SELECT count(*) FROM shows WHERE shows.{fk} = {table}.id),
+                upcoming_shows_count = (SELECT count(*) FROM shows
+                                        WHERE shows.{fk} = {table}.id AND shows.start_time >= now()),
+                last_show_time = (SELECT max(start_time) FROM shows WHERE shows.{fk} = {table}.id)
+        """)
+
+
+def downgrade():
+    for table, fk in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_upcoming_shows_count'))
+            batch_op.drop_column('last_show_time')
+            batch_op.drop_column('upcoming_shows_count')
+            batch_op.drop_column('shows_count')
@@ -0,0 +1,68 @@
+"""show end times and exclusion constraints against double bookings
+
+Revision ID: f3a8c6d2e017
+Revises: e1f4c7a9d2b6
+Create Date: 2026-10-18 17:26:09.412655
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c6d2e017'
+down_revision = 'e1f4c7a9d2b6'
+branch_labels = None
+depends_on = None
+
+
+# Must match scheduling.EXCLUSION_CONSTRAINTS.
+CONSTRAINTS = [
+    ('shows_venue_id_during_excl', 'venue_id'),
+    ('shows_artist_id_during_excl', 'artist_id'),
+]
+
+DEFAULT_MINUTES = 120
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    # A show without a start time would occupy (-infinity, end_time).
+    op.execute("UPDATE shows SET start_time = updated_at WHERE start_time IS NULL")
+    with op.batch_alter_table('shows', schema=None) as batch_op:
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.add_column(sa.Column('end_time', sa.DateTime(), nullable=True))
+
+    # Existing shows get the default length, cut short where the venue or
+    # the artist has its next show, so double bookings already in the data
+    # do not block the constraints. Shows sharing a start time keep one
+    # full slot; the others become empty ranges, which overlap nothing.
+    op.execute(f"""
+        UPDATE shows SET end_time = b.end_time
+        FROM (
+            SELECT id, least(
+                start_time + interval '{DEFAULT_MINUTES} minutes',
+                lead(start_time) OVER (PARTITION BY venue_id ORDER BY start_time, id),
+                lead(start_time) OVER (PARTITION BY artist_id ORDER BY start_time, id)
+            ) AS end_time
+            FROM shows
+        ) b
+        WHERE shows.id = b.id
+    """)
+    with op.batch_alter_table('shows', schema=None) as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+
+    for name, column in CONSTRAINTS:
+        op.execute(f"""
+            ALTER TABLE shows ADD CONSTRAINT {name}
+            EXCLUDE USING gist ({column} WITH =, tsrange(start_time, end_time) WITH &&)
+        """)
+
+
+def downgrade():
+    for name, column in reversed(CONSTRAINTS):
+        op.execute(f"ALTER TABLE shows DROP CONSTRAINT {name}")
+    with op.batch_alter_table('shows', schema=None) as batch_op:
+        batch_op.drop_column('end_time')
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=True)
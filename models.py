@@ -1,20 +1,37 @@
 import csv
+import os
+import sqlite3
+from datetime import datetime, timedelta
 
-from flask import Flask
+from flask import current_app
 from flask_migrate import Migrate
-from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql.functions import now
 
 import config
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-app.config['SQLALCHEMY_DATABASE_URI'] = config.SQLALCHEMY_DATABASE_URI
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = config.SQLALCHEMY_TRACK_MODIFICATIONS
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Bound to the application in app.create_app().
+db = SQLAlchemy()
+migrate = Migrate()
+
+
+def version_stamp():
+    # updated_at versions a row for incremental exports and fragment cache
+    # keys, so it is stamped here to the microsecond: SQLite's
+    # CURRENT_TIMESTAMP has one-second resolution, and two writes within
+    # the same second would keep the same key. UTC, like CURRENT_TIMESTAMP.
+    return datetime.utcnow()
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # Deletes rely on ON DELETE CASCADE, which SQLite only honors with
+    # foreign keys enforced.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys = ON')
 
 
 class Genre(db.Model):
@@ -32,7 +49,7 @@ class Genre(db.Model):
 
 def create_genre():
     if Genre.query.count() == 0:
-        with open('genres.csv', 'r') as f:
+        with open(os.path.join(config.basedir, 'genres.csv'), 'r') as f:
             reader = csv.reader(f)
             for row in reader:
                 db.session.add(Genre(name=row[0]))
@@ -55,7 +72,7 @@ class State(db.Model):
 
 def create_state():
     if State.query.count() == 0:
-        with open('states.csv', 'r') as f:
+        with open(os.path.join(config.basedir, 'states.csv'), 'r') as f:
             reader = csv.reader(f)
             for row in reader:
                 db.session.add(State(code=row[0]))
@@ -65,6 +82,9 @@ def create_state():
 
 class Venue(db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        db.Index('ix_venues_state_id_city', 'state_id', 'city'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -77,9 +97,20 @@ class Venue(db.Model):
     website_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.Text)
+    # Maintained by database triggers, see search.py.
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite')))
+    updated_at = db.Column(db.DateTime, default=version_stamp, onupdate=version_stamp,
+                           server_default=db.func.now(), nullable=False, index=True)
+
+    # Maintained from show writes, see counters.py.
+    shows_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    upcoming_shows_count = db.Column(db.Integer, default=0, server_default='0', nullable=False, index=True)
+    last_show_time = db.Column(db.DateTime)
+    # Set instead of deleting the row when SOFT_DELETE is on, see deletion.py.
+    deleted_at = db.Column(db.DateTime)
 
     genres = db.relationship("Genre", secondary="venue_genre", backref="venues")
-    shows = db.relationship('Show', backref='venue')
+    shows = db.relationship('Show', backref='venue', passive_deletes=True)
     state = db.relationship('State', backref='venues')
 
     def __repr__(self):
@@ -91,7 +122,7 @@ class Venue(db.Model):
 
 venue_genre = db.Table(
     "venue_genre",
-    db.Column("venue_id", db.ForeignKey("venues.id"), primary_key=True),
+    db.Column("venue_id", db.ForeignKey("venues.id", ondelete="CASCADE"), primary_key=True),
     db.Column("genre_id", db.ForeignKey("genres.id"), primary_key=True)
 )
 
@@ -110,8 +141,18 @@ class Artist(db.Model):
     website_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.Text)
-
-    shows = db.relationship('Show', backref='artist')
+    # Maintained by database triggers, see search.py.
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite')))
+    updated_at = db.Column(db.DateTime, default=version_stamp, onupdate=version_stamp,
+                           server_default=db.func.now(), nullable=False, index=True)
+    # Maintained from show writes, see counters.py.
+    shows_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    upcoming_shows_count = db.Column(db.Integer, default=0, server_default='0', nullable=False, index=True)
+    last_show_time = db.Column(db.DateTime)
+    # Set instead of deleting the row when SOFT_DELETE is on, see deletion.py.
+    deleted_at = db.Column(db.DateTime)
+
+    shows = db.relationship('Show', backref='artist', passive_deletes=True)
     state = db.relationship('State', backref='artists')
 
     def __repr__(self):
@@ -123,18 +164,67 @@ class Artist(db.Model):
 
 artist_genre = db.Table(
     "artist_genre",
-    db.Column("artist_id", db.ForeignKey("artists.id"), primary_key=True),
+    db.Column("artist_id", db.ForeignKey("artists.id", ondelete="CASCADE"), primary_key=True),
     db.Column("genre_id", db.ForeignKey("genres.id"), primary_key=True)
 )
 
 
+def set_genres(association, fk, entity_id, genre_ids, new=False):
+    """Make `genre_ids` the genres of one venue or artist.
+
+    Diffs against the current association rows and writes the difference
+    with at most one bulk DELETE and one bulk INSERT, touching only the
+    rows of `entity_id`. Returns whether anything changed.
+    """
+    entity_column = association.c[fk]
+    wanted = set(genre_ids)
+    current = set()
+    if not new:
+        current = set(db.session.execute(
+            db.select(association.c.genre_id).where(entity_column == entity_id)
+        ).scalars())
+
+    removed = current - wanted
+    if removed:
+        db.session.execute(association.delete().where(
+            entity_column == entity_id,
+            association.c.genre_id.in_(removed)
+        ))
+
+    added = wanted - current
+    if added:
+        db.session.execute(association.insert(), [
+            {fk: entity_id, "genre_id": genre_id} for genre_id in sorted(added)
+        ])
+
+    return bool(removed or added)
+
+
+def default_end_time(context):
+    start_time = context.get_current_parameters().get('start_time')
+    if not isinstance(start_time, datetime):
+        start_time = datetime.now()
+    return start_time + timedelta(minutes=current_app.config['SHOW_DEFAULT_MINUTES'])
+
+
 class Show(db.Model):
     __tablename__ = 'shows'
+    # Leading on the foreign keys, these also serve the FK lookups of the
+    # venue and artist pages; (start_time, id) matches the /shows keyset.
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
-    start_time = db.Column(db.DateTime, default=db.func.now())
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    start_time = db.Column(db.DateTime, default=db.func.now(), nullable=False)
+    # Overlapping shows of a venue or an artist are rejected, see scheduling.py.
+    end_time = db.Column(db.DateTime, default=default_end_time, nullable=False)
+    updated_at = db.Column(db.DateTime, default=version_stamp, onupdate=version_stamp,
+                           server_default=db.func.now(), nullable=False, index=True)
 
     def __repr__(self):
         return f"<Show {self.id}>"
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from flask import Response
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf'))
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+
+    def observe(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if wait <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+
+    def timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        pool = self.pool
+        capacity = checked_out = None
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+        with self._lock:
+            return {
+                "pool_capacity": capacity,
+                "pool_checked_out": checked_out,
+                "pool_saturation": checked_out / capacity if capacity else None,
+                "checkouts_total": self.checkouts,
+                "checkout_timeouts_total": self.timeouts,
+                "checkout_wait_seconds_total": self.wait_total,
+                "checkout_wait_seconds_max": self.wait_max,
+                "checkout_wait_buckets": list(zip(WAIT_BUCKETS, self.wait_buckets)),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_metrics.pool = self
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timed_out()
+            raise
+        pool_metrics.observe(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool_metrics.pool = pool
+        return pool
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if not uri.startswith('postgresql'):
+        return {}
+
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    connect_args = {}
+    if config['DB_PGBOUNCER']:
+        # PgBouncer does the pooling. Keep no idle connections here and send
+        # no startup options it would reject; psycopg2 never prepares
+        # statements server-side, so transaction pooling is safe.
+        options['poolclass'] = NullPool
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+        )
+        if config['DB_STATEMENT_TIMEOUT_MS']:
+            connect_args['options'] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+def init_app(app):
+    timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+    if app.config['DB_PGBOUNCER'] and timeout:
+        # Session settings leak between clients under transaction pooling,
+        # so the timeout is scoped to each transaction instead.
+        @event.listens_for(Engine, 'begin')
+        def set_statement_timeout(conn):
+            if conn.dialect.name == 'postgresql':
+                conn.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+    @app.route('/metrics/db-pool')
+    def db_pool_metrics():
+        lines = []
+        for name, value in pool_metrics.snapshot().items():
+            if name == 'checkout_wait_buckets':
+                cumulative = 0
+                for bound, count in value:
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else bound
+                    lines.append(f'fyyur_db_checkout_wait_seconds_bucket{{le="{le}"}} {cumulative}')
+            elif value is not None:
+                lines.append(f'fyyur_db_{name} {value}')
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain')
@@ -0,0 +1,225 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import and_, or_
+
+from deletion import live
+from models import db, Venue, Artist, State, Show, artist_genre
+from reference import reference_data
+
+# Shared read queries behind the HTML pages and the JSON API. Each one
+# selects plain columns in a single statement; nothing here hydrates
+# relationships lazily. Soft-deleted venues and artists, and their shows,
+# are left out.
+
+SHOW_CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
+
+SHOW_COLUMNS = {
+    "id": Show.id,
+    "start_time": Show.start_time,
+    "end_time": Show.end_time,
+    "updated_at": Show.updated_at,
+    "venue_id": Show.venue_id,
+    "venue_name": Venue.name.label("venue_name"),
+    "venue_image_link": Venue.image_link.label("venue_image_link"),
+    "venue_updated_at": Venue.updated_at.label("venue_updated_at"),
+    "artist_id": Show.artist_id,
+    "artist_name": Artist.name.label("artist_name"),
+    "artist_image_link": Artist.image_link.label("artist_image_link"),
+    "artist_updated_at": Artist.updated_at.label("artist_updated_at"),
+}
+
+
+def show_cursor(show):
+    return f"{show.start_time.strftime(SHOW_CURSOR_FORMAT)}-{show.id}"
+
+
+def parse_show_cursor(cursor):
+    start_time, _, show_id = cursor.partition('-')
+    return datetime.strptime(start_time, SHOW_CURSOR_FORMAT), int(show_id)
+
+
+SHOW_FILTER_ARGS = ('from', 'to', 'state', 'city', 'genre')
+
+
+def parse_show_filters(args):
+    """Show filters from query-string args: `from` and `to` (inclusive
+    dates, YYYY-MM-DD), `state` (code), `city` and `genre` (name).
+
+    Returns normalized criteria for show_criteria(), so equivalent
+    requests share a cache key. Raises ValueError for a malformed date or
+    an unknown state or genre.
+    """
+    filters = {}
+    if args.get('from'):
+        filters['start'] = datetime.strptime(args['from'], '%Y-%m-%d')
+    if args.get('to'):
+        filters['end'] = datetime.strptime(args['to'], '%Y-%m-%d') + timedelta(days=1)
+    if args.get('state'):
+        filters['state_id'] = reference_data.state_id(args['state'])
+        if filters['state_id'] is None:
+            raise ValueError(f"Unknown state {args['state']!r}")
+    if args.get('city', '').strip():
+        filters['city'] = args['city'].strip().lower()
+    if args.get('genre'):
+        filters['genre_id'] = reference_data.genre_ids_by_name([args['genre']])[0]
+        if filters['genre_id'] is None:
+            raise ValueError(f"Unknown genre {args['genre']!r}")
+    return filters
+
+
+def show_criteria(start=None, end=None, state_id=None, city=None, genre_id=None):
+    """WHERE clauses for the filters; the statement must join Venue and
+    Artist. The date range is a range on start_time, so (start_time, id)
+    serves it."""
+    criteria = [live(Venue), live(Artist)]
+    if start is not None:
+        criteria.append(Show.start_time >= start)
+    if end is not None:
+        criteria.append(Show.start_time < end)
+    if state_id is not None:
+        criteria.append(Venue.state_id == state_id)
+    if city is not None:
+        criteria.append(db.func.lower(Venue.city) == city)
+    if genre_id is not None:
+        # A show has the genres of its artist.
+        criteria.append(db.select(artist_genre.c.artist_id).where(
+            artist_genre.c.artist_id == Show.artist_id,
+            artist_genre.c.genre_id == genre_id,
+        ).exists())
+    return criteria
+
+
+def split_shows(shows_list):
+    # "now" is read once per request so that every show lands in exactly one
+    # list, including a show starting this very moment.
+    now = datetime.now()
+    past_shows = [sh for sh in shows_list if sh.start_time < now]
+    upcoming_shows = [sh for sh in shows_list if sh.start_time >= now]
+    return past_shows, upcoming_shows
+
+
+def venue_areas():
+    # One ordered join for every area; rows of the same (city, state) are
+    # adjacent, so they can be grouped in Python on any backend.
+    rows = db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.city,
+            State.code.label("state")
+        ).join(
+            State, Venue.state_id == State.id
+        ).filter(
+            live(Venue)
+        ).order_by(
+            State.code, Venue.city, Venue.name, Venue.id
+        ).all()
+
+    areas = []
+    for (city, state), area_venues in groupby(rows, key=lambda row: (row.city, row.state)):
+        areas.append({
+            "city": city,
+            "state": state,
+            "venues": [{"id": v.id, "name": v.name} for v in area_venues]
+        })
+    return areas
+
+
+def show_page(after=None, per_page=30, fields=SHOW_COLUMNS, filters=None):
+    """One keyset page of shows ordered by (start_time, id).
+
+    `fields` names the SHOW_COLUMNS to select; id and start_time are always
+    included for the cursor. `filters` are keyword arguments of
+    show_criteria(). Returns the rows and the cursor of the next page, or
+    None on the last page. Raises ValueError for a malformed `after` cursor.
+    """
+    names = ['id', 'start_time'] + [f for f in fields if f not in ('id', 'start_time')]
+    query = db.session.query(
+            *[SHOW_COLUMNS[name] for name in names]
+        ).join(
+            Venue, Show.venue_id == Venue.id
+        ).join(
+            Artist, Show.artist_id == Artist.id
+        ).filter(
+            *show_criteria(**(filters or {}))
+        ).order_by(Show.start_time, Show.id)
+
+    if after:
+        after_time, after_id = parse_show_cursor(after)
+        query = query.filter(or_(
+            Show.start_time > after_time,
+            and_(Show.start_time == after_time, Show.id > after_id)
+        ))
+
+    # Fetch one extra row to know whether there is a next page.
+    rows = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = show_cursor(rows[-1])
+    return rows, next_cursor
+
+
+def show_calendar(start, end, **filters):
+    """Shows per day and area (city, state) in [start, end), in one
+    GROUP BY over the start_time range. Ordered by day, state and city."""
+    day = db.func.date(Show.start_time, type_=db.Date)
+    rows = db.session.query(
+            day.label("day"),
+            Venue.city,
+            Venue.state_id,
+            db.func.count().label("shows")
+        ).join(
+            Venue, Show.venue_id == Venue.id
+        ).join(
+            Artist, Show.artist_id == Artist.id
+        ).filter(
+            *show_criteria(start, end, **filters)
+        ).group_by(
+            day, Venue.city, Venue.state_id
+        ).all()
+
+    calendar = [{
+        "date": row.day.isoformat(),
+        "city": row.city,
+        "state": reference_data.state_code(row.state_id),
+        "shows": row.shows,
+    } for row in rows]
+    calendar.sort(key=lambda area: (area["date"], area["state"] or '', area["city"] or ''))
+    return calendar
+
+
+def venue_shows_statement(venue_id):
+    return db.select(
+            Artist.id.label("artist_id"),
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+            Artist.updated_at.label("artist_updated_at"),
+            Show.start_time
+        ).select_from(Show).join(
+            Artist, Show.artist_id == Artist.id
+        ).where(
+            Show.venue_id == venue_id, live(Artist)
+        ).order_by(Show.start_time)
+
+
+def artist_shows_statement(artist_id):
+    return db.select(
+            Venue.id.label("venue_id"),
+            Venue.name.label("venue_name"),
+            Venue.image_link.label("venue_image_link"),
+            Venue.updated_at.label("venue_updated_at"),
+            Show.start_time
+        ).select_from(Show).join(
+            Venue, Show.venue_id == Venue.id
+        ).where(
+            Show.artist_id == artist_id, live(Venue)
+        ).order_by(Show.start_time)
+
+
+def venue_shows(venue_id):
+    return db.session.execute(venue_shows_statement(venue_id)).all()
+
+
+def artist_shows(artist_id):
+    return db.session.execute(artist_shows_statement(artist_id)).all()
@@ -0,0 +1,91 @@
+import threading
+
+from sqlalchemy import event
+
+from instrumentation import unaccounted
+from models import db, Genre, State
+
+
+class ReferenceData:
+    """Process-wide cache of the Genre and State seed tables.
+
+    The tables only change when they are seeded, so every lookup is served
+    from memory. Writes to either table through the ORM bump `version` and
+    drop the cached copy; the next lookup reloads it. Loading does not count
+    against the query budget of the request that triggers it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self.version = 0
+
+    def warm(self):
+        with unaccounted():
+            genres = db.session.query(Genre.id, Genre.name).order_by(Genre.name).all()
+            states = db.session.query(State.id, State.code).order_by(State.code).all()
+        data = {
+            "genre_choices": [(g.id, g.name) for g in genres],
+            "state_choices": [(s.id, s.code) for s in states],
+            "genres": {g.id: g.name for g in genres},
+            "states": {s.id: s.code for s in states},
+            "genres_by_name": {g.name.lower(): g.id for g in genres},
+            "states_by_code": {s.code.upper(): s.id for s in states},
+        }
+        with self._lock:
+            self._data = data
+        return data
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+            self.version += 1
+
+    def _get(self, key):
+        data = self._data
+        if data is None:
+            data = self.warm()
+        return data[key]
+
+    def genre_choices(self):
+        return self._get("genre_choices")
+
+    def state_choices(self):
+        return self._get("state_choices")
+
+    def state_id(self, code):
+        return self._get("states_by_code").get(code.strip().upper())
+
+    def genre_ids_by_name(self, names):
+        known = self._get("genres_by_name")
+        return [known.get(name.strip().lower()) for name in names]
+
+    def genre_ids(self, genre_ids):
+        known = self._get("genres")
+        return [genre_id for genre_id in genre_ids if genre_id in known]
+
+    def genre_names(self, genre_ids):
+        known = self._get("genres")
+        return sorted(known[genre_id] for genre_id in genre_ids if genre_id in known)
+
+    def state_code(self, state_id):
+        return self._get("states").get(state_id)
+
+
+reference_data = ReferenceData()
+
+
+def _invalidate(mapper, connection, target):
+    reference_data.invalidate()
+
+
+def _invalidate_if_modified(mapper, connection, target):
+    # Backref appends (venue.genres) mark genres dirty without changing them.
+    if db.session.is_modified(target, include_collections=False):
+        reference_data.invalidate()
+
+
+for _model in (Genre, State):
+    event.listen(_model, 'after_insert', _invalidate)
+    event.listen(_model, 'after_update', _invalidate_if_modified)
+    event.listen(_model, 'after_delete', _invalidate)
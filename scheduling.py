@@ -0,0 +1,182 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import event, text
+
+from models import db, Show
+
+# A venue and an artist can each hold one booking at a time. Shows occupy
+# [start_time, end_time). On Postgres two exclusion constraints over
+# tsrange(start_time, end_time) enforce this (GiST, via btree_gist for the
+# integer column); the checks below run first so forms and the API can say
+# what a show conflicts with. On SQLite the checks are the only guard.
+#
+# Every lookup is bounded by SHOW_MAX_MINUTES: a show overlapping
+# [start, end) must start after start - SHOW_MAX_MINUTES, so the
+# (venue_id, start_time) and (artist_id, start_time) indexes serve it as
+# a range scan however many shows there are.
+
+RESOURCES = (('venue', Show.venue_id), ('artist', Show.artist_id))
+
+EXCLUSION_CONSTRAINTS = {
+    'venue': 'shows_venue_id_during_excl',
+    'artist': 'shows_artist_id_during_excl',
+}
+
+
+def max_duration():
+    return timedelta(minutes=current_app.config['SHOW_MAX_MINUTES'])
+
+
+class IntervalTree:
+    """Static centered interval tree over half-open [start, end) intervals.
+
+    Built once from (start, end, value) triples in O(n log n);
+    `overlapping(start, end)` returns the values of the intervals that
+    overlap the range in O(log n + k). Empty intervals overlap nothing and
+    are dropped.
+    """
+
+    __slots__ = ('root',)
+
+    def __init__(self, intervals):
+        self.root = self._build(sorted(i for i in intervals if i[0] < i[1]))
+
+    @classmethod
+    def _build(cls, intervals):
+        if not intervals:
+            return None
+        # The middle interval contains the center, so every node keeps at
+        # least one interval and the recursion terminates.
+        center = intervals[len(intervals) // 2][0]
+        left, here, right = [], [], []
+        for interval in intervals:
+            if interval[1] <= center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        return center, here, by_end, cls._build(left), cls._build(right)
+
+    def overlapping(self, start, end):
+        found = []
+        if start >= end:
+            return found
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center, by_start, by_end, left, right = node
+            # Every interval at this node contains the center.
+            if end <= center:
+                for interval in by_start:
+                    if interval[0] >= end:
+                        break
+                    found.append(interval[2])
+                stack.append(left)
+            elif start > center:
+                for interval in by_end:
+                    if interval[1] <= start:
+                        break
+                    found.append(interval[2])
+                stack.append(right)
+            else:
+                found.extend(interval[2] for interval in by_start)
+                stack.append(left)
+                stack.append(right)
+        return found
+
+
+def _booked(fk, ids, start, end, exclude_ids=()):
+    """Existing shows of the given venues or artists that overlap [start, end)."""
+    query = db.select(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time).where(
+        fk.in_(ids),
+        Show.start_time > start - max_duration(),
+        Show.start_time < end,
+        Show.end_time > start,
+    )
+    if exclude_ids:
+        query = query.where(Show.id.notin_(exclude_ids))
+    return db.session.execute(query).all()
+
+
+def conflicts(venue_id, artist_id, start, end, exclude_id=None):
+    """Shows that would double-book the venue or the artist of a show at
+    [start, end), as (kind, show) pairs. `exclude_id` is the show being
+    moved, when editing one."""
+    exclude_ids = [exclude_id] if exclude_id is not None else ()
+    found = []
+    for kind, fk in RESOURCES:
+        entity_id = venue_id if kind == 'venue' else artist_id
+        found.extend((kind, show) for show in _booked(fk, [entity_id], start, end, exclude_ids))
+    return found
+
+
+def validate(shows):
+    """Check a batch of proposed shows against the calendar and each other.
+
+    `shows` are dicts with venue_id, artist_id, start_time and end_time,
+    and an `id` when they move an existing show. Returns one list per
+    proposed show of its conflicts: {'kind': 'venue'|'artist', 'show_id': id}
+    for a booked show, {'kind': ..., 'index': i} for another proposed one.
+    Costs one indexed query per resource over the batch's time window,
+    whatever its size.
+    """
+    results = [[] for _ in shows]
+    if not shows:
+        return results
+    start = min(show['start_time'] for show in shows)
+    end = max(show['end_time'] for show in shows)
+    moved = [show['id'] for show in shows if show.get('id') is not None]
+
+    for kind, fk in RESOURCES:
+        key = f'{kind}_id'
+        intervals = defaultdict(list)
+        for row in _booked(fk, {show[key] for show in shows}, start, end, moved):
+            intervals[getattr(row, key)].append((row.start_time, row.end_time, ('show_id', row.id)))
+        for index, show in enumerate(shows):
+            intervals[show[key]].append((show['start_time'], show['end_time'], ('index', index)))
+        trees = {entity_id: IntervalTree(items) for entity_id, items in intervals.items()}
+
+        for index, show in enumerate(shows):
+            for field, value in trees[show[key]].overlapping(show['start_time'], show['end_time']):
+                if (field, value) != ('index', index):
+                    results[index].append({'kind': kind, field: value})
+    return results
+
+
+def exclusion_violation(error):
+    """The resource ('venue' or 'artist') whose exclusion constraint an
+    IntegrityError comes from, or None."""
+    message = str(getattr(error, 'orig', error))
+    for kind, name in EXCLUSION_CONSTRAINTS.items():
+        if name in message:
+            return kind
+    return None
+
+
+# ----------------------------------------------------------------------------#
+# Schema.
+# ----------------------------------------------------------------------------#
+
+def postgres_exclusion_ddl():
+    statements = ["CREATE EXTENSION IF NOT EXISTS btree_gist"]
+    for kind, name in EXCLUSION_CONSTRAINTS.items():
+        statements.append(
+            f"ALTER TABLE shows ADD CONSTRAINT {name} "
+            f"EXCLUDE USING gist ({kind}_id WITH =, tsrange(start_time, end_time) WITH &&)")
+    return statements
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_exclusion_constraints(target, connection, tables=(), **kw):
+    # Migrated databases get the constraints from the Alembic migration;
+    # this covers databases built with db.create_all().
+    if connection.dialect.name == 'postgresql' and any(t.name == 'shows' for t in tables):
+        for statement in postgres_exclusion_ddl():
+            connection.execute(text(statement))
+
@@ -0,0 +1,245 @@
+import math
+import re
+
+from flask import current_app
+from sqlalchemy import event, func, literal_column, or_, text
+
+from deletion import live
+from models import db, Venue, Artist
+
+# Each searchable model with its genre association table and foreign key.
+# Postgres keeps a weighted `search_vector` column current through triggers
+# (see the migration adding it), SQLite keeps an FTS5 shadow table current
+# the same way. Name carries the most weight, then city/state, then genres.
+SEARCHABLE = {
+    Venue: ('venues', 'venue_genre', 'venue_id'),
+    Artist: ('artists', 'artist_genre', 'artist_id'),
+}
+
+
+def _tokens(term):
+    return re.findall(r'\w+', term or '')
+
+
+def _like_pattern(term):
+    escaped = term.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+    return f'%{escaped}%'
+
+
+def _results(rows, page, per_page):
+    count = rows[0].total if rows else 0
+    return {
+        "count": count,
+        "data": rows,
+        "page": page,
+        "pages": math.ceil(count / per_page),
+    }
+
+
+class LikeSearch:
+    """Portable fallback: substring match on the name only."""
+
+    def __init__(self, model):
+        self.model = model
+        self.table, self.genre_table, self.fk = SEARCHABLE[model]
+
+    def search(self, term, page, per_page):
+        model = self.model
+        query = db.session.query(
+            model.id,
+            model.name,
+            func.count().over().label('total')
+        ).filter(live(model))
+        if term:
+            query = query.filter(model.name.ilike(_like_pattern(term), escape='!'))
+        rows = query.order_by(model.name, model.id).limit(per_page).offset((page - 1) * per_page).all()
+        return _results(rows, page, per_page)
+
+
+class PostgresSearch(LikeSearch):
+    """Ranked match on the GIN-indexed tsvector, plus a pg_trgm-indexed
+    substring match on the name so partial words keep matching."""
+
+    def search(self, term, page, per_page):
+        tokens = _tokens(term)
+        if not tokens:
+            return super().search(term, page, per_page)
+
+        model = self.model
+        tsquery = func.to_tsquery(
+            literal_column("'simple'"),
+            ' & '.join(f'{token}:*' for token in tokens)
+        )
+        rank = func.ts_rank(model.search_vector, tsquery)
+        rows = db.session.query(
+            model.id,
+            model.name,
+            func.count().over().label('total')
+        ).filter(live(model), or_(
+            model.search_vector.op('@@')(tsquery),
+            model.name.ilike(_like_pattern(term), escape='!')
+        )).order_by(
+            rank.desc(), model.name, model.id
+        ).limit(per_page).offset((page - 1) * per_page).all()
+        return _results(rows, page, per_page)
+
+
+class SQLiteSearch(LikeSearch):
+    """BM25-ranked match on the FTS5 shadow table, for local and test use."""
+
+    def search(self, term, page, per_page):
+        tokens = _tokens(term)
+        if not tokens:
+            return super().search(term, page, per_page)
+
+        rows = db.session.execute(text(f"""
+            SELECT e.id, e.name, count(*) OVER () AS total
+            FROM {self.table} e
+            LEFT JOIN (
+                SELECT rowid AS id, bm25({self.table}_fts, 10.0, 5.0, 5.0, 1.0) AS rank
+                FROM {self.table}_fts
+                WHERE {self.table}_fts MATCH :match
+            ) m ON m.id = e.id
+            WHERE (m.id IS NOT NULL OR e.name LIKE :like ESCAPE '!') AND e.deleted_at IS NULL
+            ORDER BY coalesce(m.rank, 0), e.name, e.id
+            LIMIT :limit OFFSET :offset
+        """), {
+            "match": ' '.join(f'"{token}"*' for token in tokens),
+            "like": _like_pattern(term),
+            "limit": per_page,
+            "offset": (page - 1) * per_page,
+        }).fetchall()
+        return _results(rows, page, per_page)
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SQLiteSearch,
+}
+
+
+def full_text_search(model, term, page=1, per_page=None):
+    per_page = per_page or current_app.config['SEARCH_PER_PAGE']
+    backend = BACKENDS.get(db.engine.dialect.name, LikeSearch)
+    return backend(model).search((term or '').strip(), max(page, 1), per_page)
+
+
+# ----------------------------------------------------------------------------#
+# Schema.
+# ----------------------------------------------------------------------------#
+
+def postgres_search_ddl(table, genre_table, fk):
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {table}_search_vector(entity_id integer) RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('simple', coalesce(e.name, '')), 'A') ||
+                   setweight(to_tsvector('simple', coalesce(e.city, '') || ' ' || coalesce(s.code, '')), 'B') ||
+                   setweight(to_tsvector('simple', coalesce(string_agg(g.name, ' '), '')), 'C')
+            FROM {table} e
+            LEFT JOIN states s ON s.id = e.state_id
+            LEFT JOIN {genre_table} eg ON eg.{fk} = e.id
+            LEFT JOIN genres g ON g.id = eg.genre_id
+            WHERE e.id = entity_id
+            GROUP BY e.id, s.code
+        $$ LANGUAGE sql STABLE
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION {table}_search_refresh() RETURNS trigger AS $$
+        BEGIN
+            UPDATE {table} SET search_vector = {table}_search_vector(NEW.id) WHERE id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION {genre_table}_search_refresh() RETURNS trigger AS $$
+        DECLARE
+            entity_id integer := CASE WHEN TG_OP = 'DELETE' THEN OLD.{fk} ELSE NEW.{fk} END;
+        BEGIN
+            UPDATE {table} SET search_vector = {table}_search_vector(entity_id) WHERE id = entity_id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE TRIGGER {table}_search_refresh
+        AFTER INSERT OR UPDATE OF name, city, state_id ON {table}
+        FOR EACH ROW EXECUTE PROCEDURE {table}_search_refresh()
+        """,
+        f"""
+        CREATE TRIGGER {genre_table}_search_refresh
+        AFTER INSERT OR DELETE ON {genre_table}
+        FOR EACH ROW EXECUTE PROCEDURE {genre_table}_search_refresh()
+        """,
+        f"CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)",
+        f"CREATE INDEX ix_{table}_name_trgm ON {table} USING gin (name gin_trgm_ops)",
+        f"UPDATE {table} SET search_vector = {table}_search_vector(id)",
+    ]
+
+
+def _sqlite_refresh(table, genre_table, fk, entity_id):
+    return f"""
+        DELETE FROM {table}_fts WHERE rowid = {entity_id};
+        INSERT INTO {table}_fts (rowid, name, city, state, genres)
+        SELECT e.id, e.name, e.city, s.code,
+               (SELECT group_concat(g.name, ' ') FROM {genre_table} eg
+                JOIN genres g ON g.id = eg.genre_id WHERE eg.{fk} = e.id)
+        FROM {table} e LEFT JOIN states s ON s.id = e.state_id
+        WHERE e.id = {entity_id};
+    """
+
+
+def sqlite_update_trigger(table, genre_table, fk):
+    # Like the Postgres trigger, only for the indexed columns: counter and
+    # updated_at writes leave the index alone.
+    return (f"CREATE TRIGGER {table}_fts_update AFTER UPDATE OF name, city, state_id ON {table} BEGIN "
+            f"DELETE FROM {table}_fts WHERE rowid = OLD.id; "
+            f"{_sqlite_refresh(table, genre_table, fk, 'NEW.id')} END")
+
+
+def sqlite_search_ddl(table, genre_table, fk):
+    def refresh(entity_id):
+        return _sqlite_refresh(table, genre_table, fk, entity_id)
+
+    return [
+        f"CREATE VIRTUAL TABLE {table}_fts USING fts5(name, city, state, genres)",
+        f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN {refresh('NEW.id')} END",
+        sqlite_update_trigger(table, genre_table, fk),
+        f"CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {table}_fts WHERE rowid = OLD.id; END",
+        f"CREATE TRIGGER {genre_table}_fts_insert AFTER INSERT ON {genre_table} BEGIN {refresh(f'NEW.{fk}')} END",
+        f"CREATE TRIGGER {genre_table}_fts_delete AFTER DELETE ON {genre_table} BEGIN {refresh(f'OLD.{fk}')} END",
+        f"INSERT INTO {table}_fts (rowid, name, city, state, genres) "
+        f"SELECT e.id, e.name, e.city, s.code, "
+        f"(SELECT group_concat(g.name, ' ') FROM {genre_table} eg "
+        f"JOIN genres g ON g.id = eg.genre_id WHERE eg.{fk} = e.id) "
+        f"FROM {table} e LEFT JOIN states s ON s.id = e.state_id",
+    ]
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_search_index(target, connection, tables=(), **kw):
+    # Existing Postgres databases get the index from the Alembic migration;
+    # this covers databases built from scratch with db.create_all().
+    dialect = connection.dialect.name
+    for table, genre_table, fk in SEARCHABLE.values():
+        if dialect == 'postgresql' and any(t.name == table for t in tables):
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            statements = postgres_search_ddl(table, genre_table, fk)
+        elif dialect == 'sqlite':
+            schema = dict(connection.execute(
+                text("SELECT name, sql FROM sqlite_master WHERE name IN (:fts, :trigger)"),
+                {"fts": f"{table}_fts", "trigger": f"{table}_fts_update"}).all())
+            if f"{table}_fts" not in schema or any(t.name == table for t in tables):
+                # New, or left over from a dropped table that took its triggers.
+                statements = [f"DROP TABLE IF EXISTS {table}_fts"] + sqlite_search_ddl(table, genre_table, fk)
+            elif 'UPDATE OF' not in (schema.get(f"{table}_fts_update") or ''):
+                # Built before the trigger was limited to the indexed columns.
+                statements = [f"DROP TRIGGER IF EXISTS {table}_fts_update",
+                              sqlite_update_trigger(table, genre_table, fk)]
+            else:
+                continue
+        else:
+            continue
+        for statement in statements:
+            connection.execute(text(statement))
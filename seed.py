@@ -0,0 +1,236 @@
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import click
+from flask.cli import with_appcontext
+from flask_migrate.cli import db as db_cli
+
+from cache import page_cache
+from counters import refresh
+from deletion import live
+from importer import reserve_ids
+from models import db, Venue, Artist, Show, venue_genre, artist_genre, create_state, create_genre
+from reference import reference_data
+
+# Relative weight of a state when picking where a venue or artist is, by
+# share of the US population (millions); unlisted states weigh 2.
+STATE_WEIGHTS = {
+    'CA': 39, 'TX': 30, 'FL': 22, 'NY': 20, 'PA': 13, 'IL': 13, 'OH': 12,
+    'GA': 11, 'NC': 11, 'MI': 10, 'NJ': 9, 'VA': 9, 'WA': 8, 'AZ': 7,
+    'TN': 7, 'MA': 7, 'IN': 7, 'MO': 6, 'MD': 6, 'WI': 6, 'CO': 6, 'MN': 6,
+}
+
+CITIES_PER_STATE = 8
+STREETS = ('Main St', 'Oak Ave', 'Market St', 'Mission St', 'Broadway', 'Elm St', 'Park Ave')
+WORDS = ('Blue', 'Velvet', 'Iron', 'Golden', 'Electric', 'Silver', 'Midnight', 'Crimson',
+         'Neon', 'Wild', 'Lucky', 'Lonely', 'Echo', 'Copper', 'Paper', 'Broken')
+VENUE_KINDS = ('Hall', 'Lounge', 'Room', 'Club', 'Theatre', 'Bar', 'Ballroom', 'Garden')
+ARTIST_KINDS = ('Band', 'Collective', 'Quartet', 'Orchestra', 'Trio', 'Project', 'Kids')
+# Draws per show before giving up on finding a free venue and artist.
+SHOW_ATTEMPTS = 20
+
+
+class Picker:
+    """Weighted choice with precomputed cumulative weights, so drawing a
+    million shows does not rescan the weights on every draw."""
+
+    def __init__(self, rng, items, weights):
+        self.rng = rng
+        self.items = list(items)
+        self.cum_weights = list(accumulate(weights))
+
+    def __call__(self):
+        x = self.rng.random() * self.cum_weights[-1]
+        return self.items[bisect(self.cum_weights, x)]
+
+
+def zipf(rng, items, s=1.1):
+    """Picker over `items` in a seeded random order where the k-th most
+    popular item is picked about k**s times less often than the first."""
+    items = list(items)
+    rng.shuffle(items)
+    return Picker(rng, items, [1 / (k ** s) for k in range(1, len(items) + 1)])
+
+
+class Generator:
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        states = reference_data.state_choices()
+        genres = [genre_id for genre_id, _ in reference_data.genre_choices()]
+        if not states or not genres:
+            raise click.ClickException('Load genres.csv and states.csv first: flask db seed')
+        self.state = Picker(self.rng, states, [STATE_WEIGHTS.get(code, 2) for _, code in states])
+        self.city_rank = zipf(self.rng, range(1, CITIES_PER_STATE + 1))
+        self.genre = zipf(self.rng, genres)
+        self.booked = set()
+
+    def _place(self):
+        state_id, code = self.state()
+        return state_id, f'{code} City {self.city_rank()}'
+
+    def _genres(self):
+        return {self.genre() for _ in range(self.rng.choice((1, 1, 2, 2, 3)))}
+
+    def _phone(self):
+        return f'{self.rng.randint(200, 999)}-{self.rng.randint(200, 999)}-{self.rng.randint(0, 9999):04d}'
+
+    def _name(self, kinds):
+        return f'The {self.rng.choice(WORDS)} {self.rng.choice(WORDS)} {self.rng.choice(kinds)}'
+
+    def venue(self, n):
+        state_id, city = self._place()
+        seeking = self.rng.random() < 0.3
+        return {
+            'name': self._name(VENUE_KINDS),
+            'city': city,
+            'state_id': state_id,
+            'address': f'{self.rng.randint(1, 9999)} {self.rng.choice(STREETS)}',
+            'phone': self._phone(),
+            'image_link': f'https://picsum.photos/seed/venue{n}/300/300',
+            'facebook_link': None,
+            'website_link': None,
+            'seeking_talent': seeking,
+            'seeking_description': 'Looking for local acts.' if seeking else None,
+            'genres': self._genres(),
+        }
+
+    def artist(self, n):
+        state_id, city = self._place()
+        seeking = self.rng.random() < 0.3
+        return {
+            'name': self._name(ARTIST_KINDS),
+            'city': city,
+            'state_id': state_id,
+            'phone': self._phone(),
+            'image_link': f'https://picsum.photos/seed/artist{n}/300/300',
+            'facebook_link': None,
+            'website_link': None,
+            'seeking_venue': seeking,
+            'seeking_description': 'Looking for venues to play.' if seeking else None,
+            'genres': self._genres(),
+        }
+
+    def book(self, venue_id, artist_id, start_time, end_time):
+        # Generated shows run within 18:00-01:00, so one per venue and per
+        # artist a day never overlaps; mark every evening this one touches.
+        day = (start_time - timedelta(hours=25)).date() + timedelta(days=1)
+        while day <= (end_time - timedelta(hours=18)).date():
+            self.booked.update({('venue', venue_id, day), ('artist', artist_id, day)})
+            day += timedelta(days=1)
+
+    def show(self, venue, artist):
+        """A show that double-books nobody, or None after SHOW_ATTEMPTS draws."""
+        for _ in range(SHOW_ATTEMPTS):
+            # Two years of history and six months of bookings, mostly evenings.
+            start_time = (self.now + timedelta(days=self.rng.randint(-730, 180))).replace(
+                hour=self.rng.choice((18, 19, 20, 20, 21, 21, 22)))
+            venue_id, artist_id = venue(), artist()
+            day = start_time.date()
+            if ('venue', venue_id, day) in self.booked or ('artist', artist_id, day) in self.booked:
+                continue
+            end_time = start_time + timedelta(minutes=self.rng.choice((60, 90, 120, 120, 180)))
+            self.book(venue_id, artist_id, start_time, end_time)
+            return {
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': start_time,
+                'end_time': end_time,
+            }
+        return None
+
+
+def _insert_entities(model, association, fk, rows):
+    ids = reserve_ids(model.__table__.name, len(rows))
+    genre_rows = []
+    for entity_id, row in zip(ids, rows):
+        row['id'] = entity_id
+        genre_rows.extend({fk: entity_id, 'genre_id': g} for g in row.pop('genres'))
+    db.session.execute(model.__table__.insert(), rows)
+    db.session.execute(association.insert(), genre_rows)
+    return ids
+
+
+def seed(venues=100, artists=200, shows=1000, seed=0, chunk_size=5000, echo=click.echo):
+    """Insert generated venues, artists and shows. On an empty database the
+    same seed gives the same rows, with show dates relative to today.
+    Returns the new venue and artist ids."""
+    gen = Generator(seed)
+    venue_ids, artist_ids = [], []
+    started = time.perf_counter()
+
+    for kind, count, make, model, association, fk, ids in (
+            ('venues', venues, gen.venue, Venue, venue_genre, 'venue_id', venue_ids),
+            ('artists', artists, gen.artist, Artist, artist_genre, 'artist_id', artist_ids)):
+        for offset in range(0, count, chunk_size):
+            rows = [make(n) for n in range(offset, min(offset + chunk_size, count))]
+            ids.extend(_insert_entities(model, association, fk, rows))
+            db.session.commit()
+        page_cache.invalidate(kind)
+        echo(f'{kind}: {count} ({time.perf_counter() - started:.1f}s)')
+
+    if shows:
+        if not venue_ids or not artist_ids:
+            venue_ids = venue_ids or list(db.session.execute(db.select(Venue.id).where(live(Venue))).scalars())
+            artist_ids = artist_ids or list(db.session.execute(db.select(Artist.id).where(live(Artist))).scalars())
+        if not venue_ids or not artist_ids:
+            raise click.ClickException('Shows need at least one venue and one artist.')
+        # A few venues and artists get most of the bookings.
+        venue, artist = zipf(gen.rng, venue_ids, 0.8), zipf(gen.rng, artist_ids, 0.8)
+        for row in db.session.execute(db.select(Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)):
+            gen.book(*row)
+        added = 0
+        for offset in range(0, shows, chunk_size):
+            rows = [gen.show(venue, artist) for _ in range(min(chunk_size, shows - offset))]
+            rows = [row for row in rows if row]
+            if rows:
+                db.session.execute(Show.__table__.insert(), rows)
+                refresh({row['venue_id'] for row in rows}, {row['artist_id'] for row in rows})
+                db.session.commit()
+            added += len(rows)
+        page_cache.invalidate('shows')
+        skipped = f', {shows - added} skipped as fully booked' if added < shows else ''
+        echo(f'shows: {added}{skipped} ({time.perf_counter() - started:.1f}s)')
+    return venue_ids, artist_ids
+
+
+def seed_reference_data():
+    """Load genres.csv and states.csv into the tables if they are empty."""
+    create_state()
+    create_genre()
+    reference_data.invalidate()
+
+
+@db_cli.command('seed')
+@click.option('--venues', default=0, show_default=True, help='Synthetic venues to add.')
+@click.option('--artists', default=0, show_default=True, help='Synthetic artists to add.')
+@click.option('--shows', default=0, show_default=True, help='Synthetic shows to add.')
+@click.option('--seed', 'seed_value', default=0, show_default=True, help='Random seed.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows per transaction.')
+@with_appcontext
+def seed_command(venues, artists, shows, seed_value, chunk_size):
+    """Load the genres and states, then optionally synthetic data.
+
+    Synthetic states are weighted by population and genres and bookings
+    follow a long-tail distribution, so listings and searches see
+    realistic skew.
+    """
+    seed_reference_data()
+    if venues or artists or shows:
+        seed(venues, artists, shows, seed_value, chunk_size)
+
+
+@click.command('init')
+@with_appcontext
+def init_command():
+    """Create the tables and load the reference data.
+
+    For a new database in one step; a database managed by migrations
+    runs `flask db upgrade` and then `flask db seed` instead.
+    """
+    db.create_all()
+    seed_reference_data()
+    click.echo('Database initialized.')
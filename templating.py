@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+
+import click
+from flask import Blueprint, current_app
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+# Compiled templates are kept in JINJA_BYTECODE_CACHE_DIR, shared by every
+# worker on the host. `flask templates compile` fills it at deploy time,
+# so no worker compiles a template on its first request. Entries are
+# keyed on the template name and checked against the source's checksum:
+# a changed template is recompiled, never served stale. Outside debug,
+# templates are not checked for changes on every render
+# (TEMPLATES_AUTO_RELOAD follows DEBUG).
+
+
+class SharedBytecodeCache(FileSystemBytecodeCache):
+    """FileSystemBytecodeCache for a directory written by several
+    processes: it is created on first write, and entries are replaced
+    atomically so no worker reads a half-written file."""
+
+    def dump_bytecode(self, bucket):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            os.replace(tmp, self._get_cache_filename(bucket))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            super().clear()
+
+
+def init_app(app):
+    """Must run before anything touches app.jinja_env, which is created
+    with these options on first access."""
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directory:
+        app.jinja_options = dict(app.jinja_options, bytecode_cache=SharedBytecodeCache(directory))
+    app.register_blueprint(bp)
+
+
+bp = Blueprint('templating', __name__, cli_group='templates')
+bp.cli.help = 'Precompile templates into the shared bytecode cache.'
+
+
+def compile_all(app):
+    """Compile every template into the bytecode cache. Returns the names
+    compiled and the (name, error) pairs that failed."""
+    compiled, failed = [], []
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError as e:
+            failed.append((name, e))
+        else:
+            compiled.append(name)
+    return compiled, failed
+
+
+@bp.cli.command('compile')
+@click.option('--clear', is_flag=True, help='Empty the cache first.')
+def compile_command(clear):
+    """Compile all templates into JINJA_BYTECODE_CACHE_DIR."""
+    cache = current_app.jinja_env.bytecode_cache
+    if cache is None:
+        raise click.ClickException('JINJA_BYTECODE_CACHE_DIR is not set.')
+    if clear:
+        cache.clear()
+    started = time.perf_counter()
+    compiled, failed = compile_all(current_app)
+    for name, error in failed:
+        click.echo(f'{name}: {error}', err=True)
+    click.echo(f'{len(compiled)} templates compiled into {cache.directory} '
+               f'in {(time.perf_counter() - started) * 1000:.0f} ms.')
+    if failed:
+        raise SystemExit(1)
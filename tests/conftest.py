@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+# Read by config.py on import.
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ['CACHE_BACKEND'] = 'null'
+os.environ['FRAGMENT_CACHE_BACKEND'] = 'null'
+os.environ['JINJA_BYTECODE_CACHE_DIR'] = ''
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from seed import seed_reference_data  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'test.db'),
+        SQL_DEBUG_HEADERS=True,
+        WTF_CSRF_ENABLED=False,
+    )
+    with app.app_context():
+        db.create_all()
+        seed_reference_data()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
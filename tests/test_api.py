@@ -0,0 +1,34 @@
+import pytest
+
+import counters
+from models import db, Venue
+from seed import seed
+
+
+def quiet(message):
+    pass
+
+
+@pytest.fixture
+def venue_id(app):
+    seed(3, 5, 60, echo=quiet)
+    counters.reconcile()
+    db.session.commit()
+    return db.session.execute(db.select(Venue.id).order_by(Venue.shows_count.desc())).scalars().first()
+
+
+@pytest.mark.parametrize('fields', ['shows_count', 'upcoming_shows_count', 'past_shows_count',
+                                    'name,shows_count,upcoming_shows_count,past_shows_count'])
+def test_counts_come_from_the_stored_counters(client, venue_id, fields):
+    response = client.get(f'/api/v1/venues/{venue_id}?fields={fields}')
+    assert response.status_code == 200
+    assert response.headers['X-DB-Query-Count'] == '1'
+    assert sorted(response.get_json()) == sorted(fields.split(','))
+
+
+def test_detail_defaults_list_each_field_once(client, venue_id):
+    data = client.get(f'/api/v1/venues/{venue_id}').get_json()
+    venue = Venue.query.get(venue_id)
+    assert data['shows_count'] == venue.shows_count == len(data['past_shows']) + len(data['upcoming_shows'])
+    assert data['upcoming_shows_count'] == venue.upcoming_shows_count == len(data['upcoming_shows'])
+    assert data['past_shows_count'] == len(data['past_shows'])
@@ -0,0 +1,33 @@
+import pytest
+
+from cache import RedisCache, page_cache
+from models import db, Venue
+
+
+@pytest.fixture
+def redis_down(app, monkeypatch):
+    pytest.importorskip('redis')
+    # Nothing listens on port 1: every command fails to connect.
+    monkeypatch.setattr(page_cache, 'backend', RedisCache('redis://127.0.0.1:1/0'))
+
+
+@pytest.mark.parametrize('path', ['/', '/venues', '/artists', '/shows'])
+def test_pages_render_while_redis_is_down(redis_down, client, path):
+    assert client.get(path).status_code == 200
+
+
+def test_saved_venue_is_reported_while_redis_is_down(redis_down, client):
+    response = client.post('/venues/create', data={
+        'name': 'Redis Down Hall', 'city': 'San Francisco', 'state': 1, 'address': '1 Market St',
+        'phone': '415-000-0000', 'genres': 1, 'image_link': 'https://example.com/venue.jpg',
+    }, follow_redirects=True)
+    assert b'Redis Down Hall was successfully listed!' in response.data
+    assert db.session.query(Venue).filter_by(name='Redis Down Hall').count() == 1
+
+
+def test_local_redis_caches_pages(app, client, monkeypatch):
+    monkeypatch.setattr(page_cache, 'backend', RedisCache('local://'))
+    page_cache.backend.client.flushdb()
+    client.get('/venues')
+    response = client.get('/venues')
+    assert response.headers['X-DB-Query-Count'] == '0'
@@ -0,0 +1,23 @@
+from seed import seed
+
+
+def quiet(message):
+    pass
+
+
+def test_api_page_size_follows_app_config(app, client):
+    seed(10, 0, 0, echo=quiet)
+    app.config.update(API_PAGE_SIZE=3, API_MAX_PAGE_SIZE=5)
+    assert len(client.get('/api/v1/venues').get_json()['data']) == 3
+    assert len(client.get('/api/v1/venues?limit=50').get_json()['data']) == 5
+
+
+def test_show_limits_follow_app_config(app, client):
+    app.config.update(SHOW_MAX_MINUTES=60, API_MAX_VALIDATE_SHOWS=1)
+    show = {'venue_id': 1, 'artist_id': 1, 'start_time': '2030-01-01T20:00:00'}
+    response = client.post('/api/v1/shows/validate', json={'shows': [dict(show, duration=90)]})
+    assert response.status_code == 400
+    assert b'1 to 60 minutes' in response.data
+    response = client.post('/api/v1/shows/validate', json={'shows': [show, show]})
+    assert response.status_code == 400
+    assert b'At most 1 shows' in response.data
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import counters
+from models import db, Venue, Artist, Show, venue_genre, artist_genre
+
+
+@pytest.fixture
+def lineup(app):
+    app.config['SQL_STRICT'] = True
+    db.session.add_all([
+        Venue(id=1, name='Doomed Hall', city='City', state_id=1),
+        Venue(id=2, name='Other Hall', city='City', state_id=1),
+        Artist(id=1, name='Doomed Band', city='City', state_id=1),
+        Artist(id=2, name='Other Band', city='City', state_id=1),
+    ])
+    db.session.flush()
+    db.session.execute(venue_genre.insert(), [{'venue_id': 1, 'genre_id': 1}, {'venue_id': 2, 'genre_id': 1}])
+    db.session.execute(artist_genre.insert(), [{'artist_id': 1, 'genre_id': 1}, {'artist_id': 2, 'genre_id': 1}])
+    start = datetime.now() + timedelta(days=7)
+    db.session.execute(Show.__table__.insert(), [
+        {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start + timedelta(days=day),
+         'end_time': start + timedelta(days=day, hours=2)}
+        for day, (venue_id, artist_id) in enumerate([(1, 1), (1, 2), (1, 2), (2, 1), (2, 2)])
+    ])
+    counters.rebuild()
+    db.session.commit()
+
+
+def show_counts(model):
+    db.session.expire_all()
+    return dict(db.session.execute(db.select(model.id, model.shows_count).order_by(model.id)).all())
+
+
+def test_hard_delete_cascades_and_refreshes_counters(lineup, client):
+    response = client.post('/venues/1/delete')
+    assert response.status_code == 302
+    assert int(response.headers['X-DB-Query-Count']) <= 3
+
+    assert Venue.query.get(1) is None
+    assert db.session.query(Show).filter_by(venue_id=1).count() == 0
+    assert db.session.execute(db.select(venue_genre).where(venue_genre.c.venue_id == 1)).all() == []
+    assert show_counts(Artist) == {1: 1, 2: 1}
+    assert show_counts(Venue) == {2: 2}
+
+    counted = show_counts(Artist)
+    counters.rebuild()
+    assert show_counts(Artist) == counted
+
+
+def test_soft_delete_hides_the_row_everywhere(lineup, app, client):
+    app.config['SOFT_DELETE'] = True
+    response = client.post('/artists/1/delete')
+    assert response.status_code == 302
+    assert int(response.headers['X-DB-Query-Count']) <= 3
+
+    assert Artist.query.get(1).deleted_at is not None
+    assert db.session.query(Show).filter_by(artist_id=1).count() == 2
+    assert show_counts(Venue) == {1: 2, 2: 1}
+
+    for path in ('/', '/artists', '/shows', '/venues/1', '/venues/2', '/api/v1/artists', '/api/v1/shows'):
+        response = client.get(path)
+        assert response.status_code == 200, path
+        assert b'Doomed Band' not in response.data, path
+    response = client.post('/artists/search', data={'search_term': 'doomed'})
+    assert b'Doomed Band' not in response.data
+    for path in ('/artists/1', '/artists/1/edit', '/api/v1/artists/1'):
+        assert client.get(path).status_code == 404, path
+    assert client.post('/artists/1/delete').status_code == 404
+
+
+def test_deleting_a_missing_row_is_a_404(lineup, client):
+    assert client.post('/venues/99/delete').status_code == 404
+    assert client.post('/artists/99/delete').status_code == 404
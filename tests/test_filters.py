@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import babel.dates
+import dateutil.parser
+import pytest
+
+from app import DATETIME_FORMATS, format_datetime
+
+VALUES = [
+    datetime(2019, 5, 21, 21, 30),
+    datetime(2035, 4, 1, 20, 0),
+    datetime(2024, 2, 29, 0, 5),
+    datetime(2024, 12, 31, 12, 0),
+]
+
+
+def uncached(value, format='medium', locale='en'):
+    # The filter before patterns and values were cached.
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    return babel.dates.format_datetime(value, DATETIME_FORMATS.get(format, format), locale=locale)
+
+
+@pytest.mark.parametrize('format', ['full', 'medium', 'long', 'short', 'yyyy-MM-dd HH:mm'])
+@pytest.mark.parametrize('value', VALUES)
+def test_matches_babel(value, format):
+    assert format_datetime(value, format) == uncached(value, format)
+    # Served from the memo the second time.
+    assert format_datetime(value, format) == uncached(value, format)
+
+
+@pytest.mark.parametrize('value', ['2019-05-21T21:30:00.000Z', '2019-05-21 21:30:00', 'May 21 2019 9:30pm'])
+def test_parses_strings(value):
+    assert format_datetime(value, 'full') == uncached(value, 'full')
+
+
+def test_locale():
+    value = VALUES[0]
+    assert format_datetime(value, 'full', 'de') == uncached(value, 'full', 'de')
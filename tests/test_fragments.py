@@ -0,0 +1,32 @@
+import pytest
+
+from cache import LRUCache, fragment_cache
+from models import db, Venue
+from seed import seed
+
+
+@pytest.fixture
+def fragments(app, monkeypatch):
+    monkeypatch.setattr(fragment_cache, 'backend', LRUCache(1000, 0))
+    return fragment_cache.backend
+
+
+def test_edit_within_the_same_second_renders_again(fragments, client):
+    seed(1, 1, 1, echo=lambda message: None)
+    venue = Venue.query.get(1)
+    assert venue.name.encode() in client.get('/shows').data
+    cached = len(fragments._data)
+    assert cached
+
+    venue.name = 'Renamed Right Away'
+    db.session.commit()
+    assert b'Renamed Right Away' in client.get('/shows').data
+    assert len(fragments._data) == cached + 1
+
+
+def test_unchanged_rows_are_served_from_the_cache(fragments, client):
+    seed(1, 1, 1, echo=lambda message: None)
+    first = client.get('/shows').data
+    cached = len(fragments._data)
+    assert client.get('/shows').data == first
+    assert len(fragments._data) == cached
@@ -0,0 +1,44 @@
+import pytest
+
+from exporter import export_text
+from importer import import_file
+from models import db, Show
+from seed import seed
+
+
+def quiet(message, err=False):
+    pass
+
+
+def show_times():
+    return db.session.execute(
+        db.select(Show.venue_id, Show.artist_id, Show.start_time, Show.end_time).order_by(Show.start_time)
+    ).all()
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'csv'])
+def test_exported_shows_import_back(app, tmp_path, fmt):
+    seed(5, 5, 10, echo=quiet)
+    exported = show_times()
+    assert len(exported) == 10
+    path = tmp_path / f'shows.{fmt}'
+    path.write_text(''.join(export_text('shows', fmt)))
+
+    db.session.execute(db.delete(Show.__table__))
+    db.session.commit()
+    assert import_file('shows', str(path), echo=quiet) == (10, 0)
+    assert show_times() == exported
+
+
+def test_show_start_time_formats(app, tmp_path):
+    seed(1, 1, 0, echo=quiet)
+    path = tmp_path / 'shows.csv'
+    path.write_text(
+        'venue_id,artist_id,start_time,duration,end_time\n'
+        '1,1,2030-01-01T20:00:00,,2030-01-01T21:30:00\n'
+        '1,1,2030-01-02 20:00:00,60,\n'
+        '1,1,2030-01-03T20:00:00,,2030-01-03T19:00:00\n'
+        '1,1,not a time,60,\n'
+    )
+    assert import_file('shows', str(path), echo=quiet) == (2, 2)
+    assert [(s.end_time - s.start_time).total_seconds() / 60 for s in show_times()] == [90, 60]
@@ -0,0 +1,17 @@
+from instrumentation import fingerprint
+from models import db, Venue
+
+
+def test_statement_count_is_per_request(app, client):
+    app.config['SQL_STRICT'] = True
+    db.session.execute(Venue.__table__.insert(), [{'name': 'Hall', 'city': 'City', 'state_id': 1}])
+    db.session.commit()
+    for path in ('/venues', '/venues', '/artists'):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.headers['X-DB-Query-Count'] == '1'
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    assert fingerprint("SELECT * FROM shows WHERE id IN (?, ?, ?) AND name = 'x'") == \
+        fingerprint("SELECT *  FROM shows WHERE id IN (?) AND name = 'y'")
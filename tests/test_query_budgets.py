@@ -0,0 +1,17 @@
+import pytest
+
+from reference import reference_data
+
+
+@pytest.fixture
+def strict(app):
+    app.config['SQL_STRICT'] = True
+    return app
+
+
+@pytest.mark.parametrize('path, budget', [('/venues/create', 0), ('/artists/create', 0), ('/shows', 1)])
+def test_cold_reference_data_is_not_counted(strict, client, path, budget):
+    reference_data.invalidate()
+    response = client.get(path)
+    assert response.status_code == 200
+    assert int(response.headers['X-DB-Query-Count']) <= budget
@@ -0,0 +1,120 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import scheduling
+from importer import import_file
+from models import db, Venue, Artist, Show
+from scheduling import IntervalTree
+
+EVENING = datetime(2030, 1, 1, 20)
+
+
+def hours(start, end):
+    return EVENING + timedelta(hours=start), EVENING + timedelta(hours=end)
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(0)
+    intervals = []
+    for value in range(300):
+        start = rng.randint(0, 500)
+        intervals.append((start, start + rng.randint(0, 40), value))
+    tree = IntervalTree(intervals)
+    for _ in range(500):
+        start = rng.randint(-10, 520)
+        end = start + rng.randint(0, 60)
+        expected = {v for s, e, v in intervals if s < e and start < end and s < end and start < e}
+        assert sorted(tree.overlapping(start, end)) == sorted(expected)
+
+
+def test_interval_tree_touching_intervals_do_not_overlap():
+    tree = IntervalTree([(10, 20, 'a'), (20, 30, 'b'), (15, 15, 'empty')])
+    assert tree.overlapping(0, 10) == []
+    assert tree.overlapping(30, 40) == []
+    assert sorted(tree.overlapping(19, 21)) == ['a', 'b']
+    assert tree.overlapping(15, 16) == ['a']
+    assert tree.overlapping(12, 12) == []
+
+
+@pytest.fixture
+def booked(app):
+    db.session.add_all([
+        Venue(id=1, name='Hall', city='City', state_id=1),
+        Venue(id=2, name='Room', city='City', state_id=1),
+        Artist(id=1, name='Band', city='City', state_id=1),
+        Artist(id=2, name='Trio', city='City', state_id=1),
+    ])
+    start, end = hours(0, 2)
+    show = Show(venue_id=1, artist_id=1, start_time=start, end_time=end)
+    db.session.add(show)
+    db.session.commit()
+    return show.id
+
+
+def test_conflicts_overlap_but_not_touching(booked):
+    assert [(kind, show.id) for kind, show in scheduling.conflicts(1, 2, *hours(1, 3))] == [('venue', booked)]
+    assert [kind for kind, _ in scheduling.conflicts(2, 1, *hours(-1, 1))] == ['artist']
+    assert sorted(kind for kind, _ in scheduling.conflicts(1, 1, *hours(1, 2))) == ['artist', 'venue']
+    assert scheduling.conflicts(1, 1, *hours(2, 4)) == []
+    assert scheduling.conflicts(1, 1, *hours(-2, 0)) == []
+
+
+def test_moving_a_show_does_not_conflict_with_itself(booked):
+    assert scheduling.conflicts(1, 1, *hours(1, 3), exclude_id=booked) == []
+    start, end = hours(1, 3)
+    moved = {'id': booked, 'venue_id': 1, 'artist_id': 1, 'start_time': start, 'end_time': end}
+    assert scheduling.validate([moved]) == [[]]
+
+
+def test_validate_api_reports_conflicts_within_a_batch(booked, client):
+    def proposed(venue_id, artist_id, start, end):
+        return {'venue_id': venue_id, 'artist_id': artist_id,
+                'start_time': hours(start, end)[0].isoformat(), 'end_time': hours(start, end)[1].isoformat()}
+
+    response = client.post('/api/v1/shows/validate', json={'shows': [
+        proposed(2, 2, 5, 7),
+        proposed(2, 2, 6, 8),
+        proposed(2, 2, 7, 9),
+        proposed(1, 2, 1, 2),
+    ]})
+    assert response.status_code == 200
+    assert response.get_json() == {'valid': False, 'data': [
+        {'index': 0, 'conflicts': [{'kind': 'venue', 'index': 1}, {'kind': 'artist', 'index': 1}]},
+        {'index': 1, 'conflicts': [{'kind': 'venue', 'index': 0}, {'kind': 'venue', 'index': 2},
+                                   {'kind': 'artist', 'index': 0}, {'kind': 'artist', 'index': 2}]},
+        {'index': 2, 'conflicts': [{'kind': 'venue', 'index': 1}, {'kind': 'artist', 'index': 1}]},
+        {'index': 3, 'conflicts': [{'kind': 'venue', 'show_id': booked}]},
+    ]}
+    assert client.post('/api/v1/shows/validate', json={'shows': [proposed(2, 2, 5, 7)]}).get_json() == \
+        {'valid': True, 'data': []}
+
+
+def test_double_booking_form_post_is_rejected(booked, client):
+    response = client.post('/shows/create', data={
+        'venue_id': 1, 'artist_id': 2, 'start_time': '2030-01-01 21:00:00', 'duration': 60,
+    }, follow_redirects=True)
+    assert b'The venue is already booked' in response.data
+    assert db.session.query(Show).count() == 1
+
+    response = client.post('/shows/create', data={
+        'venue_id': 1, 'artist_id': 2, 'start_time': '2030-01-01 22:00:00', 'duration': 60,
+    }, follow_redirects=True)
+    assert b'Show was successfully listed!' in response.data
+    assert db.session.query(Show).count() == 2
+
+
+def test_import_keeps_the_first_of_two_conflicting_records(booked, tmp_path):
+    path = tmp_path / 'shows.csv'
+    path.write_text(
+        'venue_id,artist_id,start_time,duration\n'
+        '2,2,2030-01-01 20:00:00,120\n'
+        '2,2,2030-01-01 21:00:00,120\n'
+        '1,2,2030-01-01 19:00:00,120\n'
+        '2,2,2030-01-01 22:00:00,60\n'
+    )
+    assert import_file('shows', str(path), echo=lambda message, err=False: None) == (2, 2)
+    starts = db.session.execute(
+        db.select(Show.start_time).where(Show.venue_id == 2).order_by(Show.start_time)).scalars().all()
+    assert starts == [hours(0, 0)[0], hours(2, 2)[0]]
@@ -0,0 +1,46 @@
+import counters
+from models import db, Venue, Artist, Show
+from seed import seed, seed_reference_data
+
+
+def quiet(message):
+    pass
+
+
+def snapshot():
+    return (
+        db.session.execute(db.select(Venue.name, Venue.city, Venue.state_id).order_by(Venue.id)).all(),
+        db.session.execute(db.select(Show.venue_id, Show.artist_id, Show.start_time).order_by(Show.id)).all(),
+    )
+
+
+def test_same_seed_gives_same_rows(app):
+    seed(20, 30, 100, seed=7, echo=quiet)
+    first = snapshot()
+    db.drop_all()
+    db.create_all()
+    seed_reference_data()
+    seed(20, 30, 100, seed=7, echo=quiet)
+    assert snapshot() == first
+
+
+def test_shows_never_double_book(app):
+    seed(5, 5, 300, echo=quiet)
+    shows = db.session.execute(db.select(Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)).all()
+    assert shows
+    for key in ('venue_id', 'artist_id'):
+        by_key = {}
+        for show in shows:
+            by_key.setdefault(getattr(show, key), []).append(show)
+        for booked in by_key.values():
+            booked.sort(key=lambda show: show.start_time)
+            for earlier, later in zip(booked, booked[1:]):
+                assert earlier.end_time <= later.start_time
+
+
+def test_seeded_counters_match_a_rebuild(app):
+    seed(10, 20, 200, echo=quiet)
+    counted = db.session.execute(db.select(Artist.id, Artist.shows_count).order_by(Artist.id)).all()
+    assert sum(row.shows_count for row in counted) == db.session.query(Show).count()
+    counters.rebuild()
+    assert db.session.execute(db.select(Artist.id, Artist.shows_count).order_by(Artist.id)).all() == counted
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+from PIL import Image
+
+import thumbnails
+from thumbnails import FetchError, ThumbnailCache, fetch, thumbnail_url
+
+SOURCE = 'https://images.example.com/band.jpg'
+
+
+def jpeg(width, height):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(out, 'JPEG')
+    return out.getvalue()
+
+
+@pytest.fixture
+def origin(app, tmp_path, monkeypatch):
+    app.config['THUMBNAIL_DIR'] = str(tmp_path / 'thumbnails')
+    fetched = []
+
+    def fake_fetch(url, *args):
+        fetched.append(url)
+        return jpeg(1600, 900), 'image/jpeg'
+
+    monkeypatch.setattr(thumbnails, 'fetch', fake_fetch)
+    return fetched
+
+
+def url_for_thumbnail(app, size='tile'):
+    with app.test_request_context():
+        return thumbnail_url(SOURCE, size)
+
+
+@pytest.mark.parametrize('size, dimensions', [('tile', (300, 300)), ('detail', (600, 338))])
+def test_scales_and_caches(app, client, origin, size, dimensions):
+    url = url_for_thumbnail(app, size)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert Image.open(io.BytesIO(response.data)).size == dimensions
+
+    again = client.get(url)
+    assert again.data == response.data
+    assert origin == [SOURCE]
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_rejects_unsigned_and_unknown_sizes(app, client, origin):
+    url = url_for_thumbnail(app)
+    assert client.get(url.replace('sig=', 'sig=0')).status_code == 403
+    assert client.get(url.replace('/tile', '/huge')).status_code == 404
+    assert origin == []
+
+
+@pytest.mark.parametrize('url', ['http://127.0.0.1/a.jpg', 'http://10.0.0.1/a.jpg', 'file:///etc/passwd'])
+def test_fetch_refuses_private_hosts(url):
+    with pytest.raises(FetchError):
+        fetch(url)
+
+
+def test_cache_evicts_least_recently_served(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), 10000)
+    for i in range(20):
+        cache.put(f'{i:064x}', bytes([i]) * 1000, 'image/jpeg')
+        assert cache.size <= 10000
+    on_disk = sum(path.stat().st_size for path in tmp_path.rglob('*') if path.is_file())
+    assert cache.size == on_disk
+    assert cache.get(f'{19:064x}') is not None
+    assert cache.get(f'{0:064x}') is None
@@ -0,0 +1,28 @@
+import pytest
+
+from models import db, Venue
+from queries import venue_areas
+
+
+def add_venues(areas, per_area=3):
+    db.session.execute(Venue.__table__.insert(), [
+        {'name': f'Venue {area}-{i}', 'city': f'City {area}', 'state_id': 1 + area % 50}
+        for area in range(areas) for i in range(per_area)
+    ])
+    db.session.commit()
+
+
+@pytest.mark.parametrize('areas', [1, 50])
+def test_venues_page_is_one_statement(client, areas):
+    add_venues(areas)
+    response = client.get('/venues')
+    assert response.status_code == 200
+    assert response.headers['X-DB-Query-Count'] == '1'
+
+
+def test_venue_areas_groups_by_city_and_state(app):
+    add_venues(50)
+    areas = venue_areas()
+    assert len(areas) == 50
+    assert all(len(area['venues']) == 3 for area in areas)
+    assert len({(area['city'], area['state']) for area in areas}) == 50
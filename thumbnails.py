@@ -0,0 +1,283 @@
+import hashlib
+import hmac
+import io
+import ipaddress
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from flask import Blueprint, Response, abort, current_app, request, url_for
+
+# Venue and artist images are third-party URLs, often multi-megabyte.
+# Pages link them through /thumbnails/, which fetches each source once,
+# scales it to a fixed size and keeps the result on disk:
+#
+#   <THUMBNAIL_DIR>/objects/ab/ab12...   thumbnail bytes, named by their sha256
+#   <THUMBNAIL_DIR>/refs/cd/cd34...      sha256 of (size, source URL) -> object name
+#
+# Identical images behind different URLs are stored once. The object name
+# is the ETag. When the directory outgrows THUMBNAIL_CACHE_MAX_BYTES the
+# least recently served files go first. Each worker keeps a running total
+# of the directory size and only walks it to evict, or every
+# RESCAN_SECONDS to pick up what other workers wrote. Scaling needs
+# Pillow (requirements.txt).
+
+# Name -> (width, height, crop). Tiles are cropped to fill the box, detail
+# images are scaled to fit it.
+SIZES = {
+    'tile': (300, 300, True),
+    'detail': (600, 600, False),
+}
+
+RESCAN_SECONDS = 60
+
+log = logging.getLogger(__name__)
+
+bp = Blueprint('thumbnails', __name__)
+
+
+class FetchError(Exception):
+    pass
+
+
+def _signature(url, size):
+    key = current_app.config['SECRET_KEY']
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    return hmac.new(key, f'{size}\n{url}'.encode('utf-8'), hashlib.sha256).hexdigest()[:20]
+
+
+def thumbnail_url(image_link, size='tile'):
+    """URL of the `size` thumbnail of an image link. The link is signed, so
+    the proxy only fetches URLs the app rendered."""
+    if not image_link:
+        return ''
+    return url_for('thumbnails.thumbnail', size=size, url=image_link, sig=_signature(image_link, size))
+
+
+# ----------------------------------------------------------------------------#
+# Fetching.
+# ----------------------------------------------------------------------------#
+
+def _check_host(url, allow_private):
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise FetchError(f'unsupported URL {url!r}')
+    if allow_private:
+        return
+    # Image links are user input: never let them reach internal services.
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or None)}
+    except socket.gaierror as e:
+        raise FetchError(str(e))
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if not ip.is_global:
+            raise FetchError(f'{parts.hostname} resolves to non-public address {ip}')
+
+
+class _CheckedRedirects(urllib.request.HTTPRedirectHandler):
+    def __init__(self, allow_private):
+        self.allow_private = allow_private
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_host(newurl, self.allow_private)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def fetch(url, timeout=5, max_bytes=10 * 1024 * 1024, allow_private=False):
+    """The bytes and content type of an image URL. Raises FetchError."""
+    _check_host(url, allow_private)
+    opener = urllib.request.build_opener(_CheckedRedirects(allow_private))
+    req = urllib.request.Request(url, headers={'User-Agent': 'fyyur-thumbnails', 'Accept': 'image/*'})
+    try:
+        with opener.open(req, timeout=timeout) as response:
+            content_type = response.headers.get_content_type()
+            if not content_type.startswith('image/'):
+                raise FetchError(f'{url} is {content_type}, not an image')
+            data = response.read(max_bytes + 1)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise FetchError(f'{url}: {e}')
+    if len(data) > max_bytes:
+        raise FetchError(f'{url} is larger than {max_bytes} bytes')
+    return data, content_type
+
+
+def scale(data, content_type, size):
+    """Thumbnail bytes and content type."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError('thumbnails require Pillow')
+    width, height, crop = SIZES[size]
+    image = Image.open(io.BytesIO(data))
+    # JPEG sources decode at a reduced scale, which is much cheaper.
+    image.draft('RGB', (width * 2, height * 2))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    if crop:
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    else:
+        image.thumbnail((width, height), Image.LANCZOS)
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=82, optimize=True, progressive=True)
+    return out.getvalue(), 'image/jpeg'
+
+
+# ----------------------------------------------------------------------------#
+# Disk cache.
+# ----------------------------------------------------------------------------#
+
+class ThumbnailCache:
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        # Running size of the directory, None until the first put.
+        self.size = None
+        self.scanned_at = 0
+        self._lock = threading.Lock()
+
+    def _path(self, kind, name):
+        return os.path.join(self.root, kind, name[:2], name)
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get(self, ref):
+        """(object name, bytes, content type) cached for a ref, or None."""
+        try:
+            with open(self._path('refs', ref)) as f:
+                name, content_type = f.read().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        path = self._path('objects', name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Evicted; drop the dangling ref too.
+            self._remove(self._path('refs', ref))
+            return None
+        # mtime is the last time served, for eviction.
+        os.utime(path)
+        return name, data, content_type
+
+    def put(self, ref, data, content_type):
+        name = hashlib.sha256(data).hexdigest()
+        path = self._path('objects', name)
+        written = 0
+        if not os.path.exists(path):
+            self._write(path, data)
+            written += len(data)
+        ref_data = f'{name} {content_type}'.encode('utf-8')
+        self._write(self._path('refs', ref), ref_data)
+        written += len(ref_data)
+        with self._lock:
+            if self.size is None or time.monotonic() - self.scanned_at > RESCAN_SECONDS:
+                self._scan()
+            else:
+                self.size += written
+            over = self.size > self.max_bytes
+        if over:
+            self.evict()
+        return name, data, content_type
+
+    def _scan(self):
+        entries, total = [], 0
+        for kind in ('objects', 'refs'):
+            for dirpath, _, files in os.walk(os.path.join(self.root, kind)):
+                for name in files:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    total += stat.st_size
+                    if kind == 'objects':
+                        entries.append((stat.st_mtime, stat.st_size, path))
+        self.size, self.scanned_at = total, time.monotonic()
+        return entries
+
+    def evict(self):
+        """Delete least recently served objects until the cache is under
+        90% of its budget. Their refs go on next use."""
+        with self._lock:
+            entries = self._scan()
+            if self.size <= self.max_bytes:
+                return 0
+            removed = 0
+            for _, size, path in sorted(entries):
+                if self.size <= self.max_bytes * 0.9:
+                    break
+                if not self._remove(path):
+                    continue
+                self.size -= size
+                removed += 1
+            return removed
+
+
+def _cache():
+    # One per worker, so the running size outlives the request.
+    config = current_app.config
+    settings = (config['THUMBNAIL_DIR'], config['THUMBNAIL_CACHE_MAX_BYTES'])
+    cache = current_app.extensions.get('thumbnails')
+    if cache is None or (cache.root, cache.max_bytes) != settings:
+        cache = current_app.extensions['thumbnails'] = ThumbnailCache(*settings)
+    return cache
+
+
+@bp.route('/thumbnails/<size>')
+def thumbnail(size):
+    url = request.args.get('url', '')
+    if size not in SIZES:
+        abort(404)
+    if not hmac.compare_digest(request.args.get('sig', ''), _signature(url, size)):
+        abort(403)
+
+    config = current_app.config
+    cache = _cache()
+    ref = hashlib.sha256(f'{size}\n{url}'.encode('utf-8')).hexdigest()
+    cached = cache.get(ref)
+    if cached is None:
+        try:
+            data, content_type = fetch(url, config['THUMBNAIL_FETCH_TIMEOUT'],
+                                       config['THUMBNAIL_MAX_SOURCE_BYTES'], config['THUMBNAIL_ALLOW_PRIVATE'])
+            data, content_type = scale(data, content_type, size)
+        except FetchError as e:
+            log.warning('thumbnail: %s', e)
+            abort(502)
+        except RuntimeError:
+            raise
+        except Exception as e:  # an undecodable image
+            log.warning('thumbnail: cannot scale %s: %s', url, e)
+            abort(502)
+        cached = cache.put(ref, data, content_type)
+
+    name, data, content_type = cached
+    response = Response(data, mimetype=content_type)
+    response.set_etag(name)
+    # The source behind a URL can change; revalidate daily, cheaply.
+    response.cache_control.public = True
+    response.cache_control.max_age = config['THUMBNAIL_MAX_AGE']
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    app.add_template_global(thumbnail_url)
+    app.register_blueprint(bp)